@@ -0,0 +1,156 @@
+// Lazily draw Plotly figures whose data was moved out of the page at build
+// time (see src/plotly_lazy.py). Each figure <div> carries a data-plotly-src
+// attribute pointing at a gzipped JSON file with {data, layout, config}; long
+// numeric arrays in it use Plotly's typed-array spec {dtype, bdata, shape}.
+// Pages opened from file:// can't fetch(), so there the figure is loaded from
+// the .js twin of that file, which passes it to window.plotlyLazyLoaded.
+(function () {
+  "use strict";
+
+  var DTYPES = {
+    i1: Int8Array,
+    u1: Uint8Array,
+    i2: Int16Array,
+    u2: Uint16Array,
+    i4: Int32Array,
+    u4: Uint32Array,
+    f4: Float32Array,
+    f8: Float64Array,
+  };
+
+  function decodeTypedArrays(value) {
+    if (Array.isArray(value)) {
+      return value.map(decodeTypedArrays);
+    }
+    if (value && typeof value === "object") {
+      if (typeof value.bdata === "string" && DTYPES[value.dtype]) {
+        var binary = atob(value.bdata);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+          bytes[i] = binary.charCodeAt(i);
+        }
+        var flat = new DTYPES[value.dtype](bytes.buffer);
+        if (value.shape && value.shape.length === 2) {
+          var rows = [];
+          var cols = value.shape[1];
+          for (var r = 0; r < value.shape[0]; r++) {
+            rows.push(flat.subarray(r * cols, (r + 1) * cols));
+          }
+          return rows;
+        }
+        return flat;
+      }
+      Object.keys(value).forEach(function (key) {
+        value[key] = decodeTypedArrays(value[key]);
+      });
+    }
+    return value;
+  }
+
+  // Figure files are shared by content, so several divs may wait on one key
+  var scriptCallbacks = {};
+
+  window.plotlyLazyLoaded = function (key, figure) {
+    var callbacks = scriptCallbacks[key] || [];
+    delete scriptCallbacks[key];
+    callbacks.forEach(function (callback) {
+      callback(JSON.parse(JSON.stringify(figure)));
+    });
+  };
+
+  function loadFigureScript(url) {
+    var src = url.replace(/\.json\.gz$/, ".js");
+    var key = src.split("/").pop().replace(/\.js$/, "");
+    return new Promise(function (resolve, reject) {
+      if (scriptCallbacks[key]) {
+        scriptCallbacks[key].push(resolve);
+        return;
+      }
+      scriptCallbacks[key] = [resolve];
+      var script = document.createElement("script");
+      script.src = src;
+      script.onerror = function () {
+        delete scriptCallbacks[key];
+        reject(new Error("Could not load " + src));
+      };
+      document.head.appendChild(script);
+    });
+  }
+
+  function loadFigure(url) {
+    if (
+      window.location.protocol === "file:" ||
+      typeof DecompressionStream === "undefined"
+    ) {
+      return loadFigureScript(url);
+    }
+    return fetch(url).then(function (response) {
+      if (!response.ok) {
+        throw new Error("Could not load " + url + ": " + response.status);
+      }
+      var stream = response.body.pipeThrough(new DecompressionStream("gzip"));
+      return new Response(stream).json();
+    });
+  }
+
+  function getPlotly() {
+    if (window.Plotly) {
+      return Promise.resolve(window.Plotly);
+    }
+    if (window._Plotly) {
+      return Promise.resolve(window._Plotly);
+    }
+    if (typeof window.require === "function") {
+      return new Promise(function (resolve, reject) {
+        window.require(["plotly"], resolve, reject);
+      });
+    }
+    return Promise.reject(new Error("Plotly is not loaded on this page"));
+  }
+
+  function hydrate(div) {
+    var src = div.getAttribute("data-plotly-src");
+    div.removeAttribute("data-plotly-src");
+    Promise.all([loadFigure(src), getPlotly()])
+      .then(function (results) {
+        var figure = results[0];
+        return results[1].newPlot(
+          div,
+          decodeTypedArrays(figure.data),
+          figure.layout,
+          figure.config
+        );
+      })
+      .catch(function (error) {
+        console.error(error);
+      });
+  }
+
+  function init() {
+    var divs = document.querySelectorAll("div[data-plotly-src]");
+    if (!("IntersectionObserver" in window)) {
+      divs.forEach(hydrate);
+      return;
+    }
+    var observer = new IntersectionObserver(
+      function (entries) {
+        entries.forEach(function (entry) {
+          if (entry.isIntersecting) {
+            observer.unobserve(entry.target);
+            hydrate(entry.target);
+          }
+        });
+      },
+      { rootMargin: "200px 0px" }
+    );
+    divs.forEach(function (div) {
+      observer.observe(div);
+    });
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", init);
+  } else {
+    init();
+  }
+})();
@@ -138,9 +138,20 @@ html_title = "Full Stack Quantitative Finance"
 # so a file named "default.css" will overwrite the builtin "default.css".
 html_static_path = ["_static"]
 
+# CDN scripts referenced here (and by notebook outputs) are vendored into
+# _static/vendor/ with content-hashed names after the HTML build; see
+# src/vendor_assets.py.
 html_js_files = [
     "https://cdnjs.cloudflare.com/ajax/libs/require.js/2.3.4/require.min.js",
+    # Draws Plotly figures externalized by src/plotly_lazy.py as they scroll
+    # into view.
+    "plotly_lazy.js",
 ]
+# The SVG output of MathJax 3 doesn't fetch web fonts at runtime, so the
+# vendored copy works offline. Keep the version pinned: src/vendor_assets.py
+# vendors the whole es5/ tree of this exact release, so the TeX extensions
+# MathJax loads on demand are served next to it.
+mathjax_path = "https://cdn.jsdelivr.net/npm/mathjax@3.2.2/es5/tex-mml-svg.js"
 html_css_files = [
     'custom.css',
 ]
@@ -13,21 +13,72 @@ sys.path.insert(1, "./src/")
 
 import shutil
 
+import build_trace
+import pdf_build
+from artifact_bundle import import_bundle
+from asset_store import ingest_assets
+from build_trace import traced_doit_command
+from docs_staging import publish_directory, use_disk_staging, use_ram_staging
 from doit.tools import config_changed
+from fast_checker import StatFastHashChecker
+from page_weight import build_page_weight_report
+from plotly_lazy import externalize_plotly_figures
 from settings import config
+from vendor_assets import vendor_cdn_scripts
 
 DATA_DIR = Path(config("DATA_DIR"))
 OUTPUT_DIR = Path(config("OUTPUT_DIR"))
 GITHUB_PAGES_REPO_DIR = Path(config("GITHUB_PAGES_REPO_DIR"))
 
 OS_TYPE = config("OS_TYPE")
+BUILD_TRACE = config("BUILD_TRACE")
+DOCS_BUILD_IN_RAM = config("DOCS_BUILD_IN_RAM")
+
+## The PDF build needs a LaTeX toolchain and is opt-in: `doit pdf`.
+## File deps are checked stat-first with a fast hash (see src/fast_checker.py)
+## and task state is kept in doit's SQLite backend, which flushes all changed
+## tasks in a single transaction when the run ends.
+DOIT_CONFIG = {
+    "check_file_uptodate": StatFastHashChecker,
+    "backend": "sqlite3",
+    "dep_file": ".doit.sqlite3",
+    "default_tasks": [
+        "docs_staging",
+        "config",
+        "doit_fama_french",
+        "doit_yield_curve",
+        "doit_options",
+        "doit_clean_trace",
+        "compile_book",
+        "page_weight_report",
+        "copy_compiled_book_to_github_pages_repo",
+    ],
+}
+
+## With BUILD_TRACE=True, this run and every nested case-study pipeline write
+## spans to _output/build_trace.jsonl, merged at the end into a Chrome trace /
+## Perfetto timeline at _output/build_trace.json (see src/build_trace.py).
+if BUILD_TRACE:
+    build_trace.start_trace(OUTPUT_DIR / "build_trace.jsonl")
+    DOIT_CONFIG["reporter"] = build_trace.TraceReporter
+
+## Content-addressed store backing _docs/notebooks/assets (see src/asset_store.py)
+ASSET_STORE_DIR = OUTPUT_DIR / "_asset_store"
+
+## Cell-level cache used when executing notebooks (see src/cell_cache.py).
+## No task in this file executes notebooks (the case-study pipelines do), so
+## the cache only takes effect in tasks that use jupyter_execute_notebook.
+CELL_CACHE_DIR = OUTPUT_DIR / "_cell_cache"
+CELL_CACHE_MAX_GB = config("CELL_CACHE_MAX_GB")
+CELL_CACHE_MAX_AGE_DAYS = config("CELL_CACHE_MAX_AGE_DAYS")
 
 ## Helpers for handling Jupyter Notebook tasks
 # fmt: off
 ## Helper functions for automatic execution of Jupyter notebooks
 environ["PYDEVD_DISABLE_FILE_VALIDATION"] = "1"
 def jupyter_execute_notebook(notebook):
-    return f"jupyter nbconvert --execute --to notebook --ClearMetadataPreprocessor.enabled=True --log-level WARN --inplace ./src/{notebook}.ipynb"
+    """Execute in place, reusing cached cells whose source and inputs haven't changed"""
+    return f"python ./src/cell_cache.py ./src/{notebook}.ipynb --cache-dir {CELL_CACHE_DIR} --max-gb {CELL_CACHE_MAX_GB} --max-age-days {CELL_CACHE_MAX_AGE_DAYS}"
 def jupyter_to_html(notebook, output_dir=OUTPUT_DIR):
     return f"jupyter nbconvert --to html --log-level WARN --output-dir={output_dir} ./src/{notebook}.ipynb"
 def jupyter_to_md(notebook, output_dir=OUTPUT_DIR):
@@ -69,9 +120,60 @@ def copy_directory(source_dir: Path, dest_dir: Path) -> bool:
 
 
 def copy_notebook_to_folder(notebook_stem, origin_folder, destination_folder):
+    """Copy a notebook, normalized, see ``copy_normalized_notebook``."""
     origin_path = Path(origin_folder) / f"{notebook_stem}.ipynb"
     destination_path = Path(destination_folder) / f"_{notebook_stem}.ipynb"
-    shutil.copy2(origin_path, destination_path)
+    copy_normalized_notebook(origin_path, destination_path)
+
+
+# Case studies may publish everything the textbook needs as a single
+# zstd-compressed bundle at _output/textbook_bundle.tar.zst (see
+# src/artifact_bundle.py). When it exists, it is imported (verified, and only
+# changed members extracted) into _output/_bundles/<case study>; otherwise the
+# notebooks and assets are read straight out of the case-study repo.
+CASE_STUDY_BUNDLE_NAME = "textbook_bundle.tar.zst"
+BUNDLE_IMPORT_DIR = OUTPUT_DIR / "_bundles"
+
+
+def source_case_study_outputs(case_study_dir, notebook_dir, stems, assets=False):
+    """Copy a case study's notebooks (and optionally its assets) into
+    ``_docs/notebooks``, preferring the case study's bundle when present.
+
+    Args:
+        case_study_dir: path to the case-study repo
+        notebook_dir: where the executed notebooks live, relative to the repo,
+            when no bundle is published
+        stems: notebook stems to copy
+        assets: whether to ingest the case study's ``src/assets`` as well
+    """
+    case_study_dir = Path(case_study_dir)
+    bundle = case_study_dir / "_output" / CASE_STUDY_BUNDLE_NAME
+    if bundle.exists():
+        extract_dir = BUNDLE_IMPORT_DIR / case_study_dir.name
+        result = import_bundle(bundle, extract_dir)
+        if result["skipped"]:
+            print(f"Bundle {bundle} unchanged; skipping import.")
+        else:
+            print(
+                f"Imported {bundle}: {len(result['extracted'])} extracted, "
+                f"{len(result['unchanged'])} unchanged, "
+                f"{len(result['removed'])} removed"
+            )
+        notebook_origin = extract_dir / "notebooks"
+        assets_origin = extract_dir / "assets"
+    else:
+        notebook_origin = case_study_dir / notebook_dir
+        assets_origin = case_study_dir / "src" / "assets"
+
+    for stem in stems:
+        copy_notebook_to_folder(stem, notebook_origin, Path("_docs/notebooks"))
+    if assets:
+        ingest_assets(
+            assets_origin,
+            Path("_docs/notebooks") / "assets",
+            ASSET_STORE_DIR,
+            case_study_dir.name,
+        )
 
 
 # The WRDS Python package notebook lives in the inclass_examples repo as a
@@ -96,7 +198,8 @@ def run_case_study_fama_french_build():
     ``source_wrds_python_package_notebook``)."""
     try:
         subprocess.run(
-            ["doit", "-f", "../case_study_wrds_fama_french/dodo.py"], check=True
+            traced_doit_command("-f", "../case_study_wrds_fama_french/dodo.py"),
+            check=True,
         )
     except (subprocess.CalledProcessError, FileNotFoundError) as e:
         print(f"WARNING: Fama-French case-study build failed: {e}")
@@ -114,12 +217,11 @@ def source_wrds_python_package_notebook():
     dest = Path("_docs/notebooks") / f"_{WRDS_PKG_NOTEBOOK_STEM}.ipynb"
 
     subprocess.run(
-        [
-            "doit",
+        traced_doit_command(
             "-f",
-            str(INCLASS_REPO / "dodo.py"),
+            INCLASS_REPO / "dodo.py",
             f"run_notebooks:{WRDS_PKG_NOTEBOOK_STEM}",
-        ],
+        ),
         check=True,
     )
 
@@ -129,8 +231,7 @@ def source_wrds_python_package_notebook():
             f"the build."
         )
 
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(WRDS_PKG_INCLASS, dest)
+    copy_normalized_notebook(WRDS_PKG_INCLASS, dest)
 
 
 ## Strip Plotly's MathJax 2 scripts to prevent conflicts with Sphinx's MathJax 3
@@ -168,50 +269,118 @@ def _strip_mathjax2_in_notebook(nb):
     return modified
 
 
-def strip_mathjax2_from_notebook(notebook_path):
-    """Strip MathJax 2 script tags injected by Plotly from notebook cell outputs."""
-    notebook_path = Path(notebook_path)
-    with open(notebook_path, "r", encoding="utf-8") as f:
-        nb = json.load(f)
-
-    modified = _strip_mathjax2_in_notebook(nb)
-
-    if modified:
-        with open(notebook_path, "w", encoding="utf-8") as f:
-            json.dump(nb, f, indent=1, ensure_ascii=False)
-            f.write("\n")
-
-    return modified
+## Canonical notebook normalization
+# Notebooks are normalized as they are copied into _docs/notebooks, and only
+# written when the normalized bytes differ from what is already there. Their
+# mtimes therefore only move when their real content changes, so doit and
+# Sphinx don't redo work for a recopy or a re-execution that produced the same
+# result.
+VOLATILE_CELL_METADATA = ["execution", "ExecuteTime", "papermill"]
+VOLATILE_NOTEBOOK_METADATA = ["papermill"]
+_UUID = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+PLOTLY_DIV_PATTERN = re.compile(rf'<div id="({_UUID})" class="plotly-graph-div"')
+## Places Plotly's generated HTML refers to the div id: the div itself,
+## getElementById(...) and Plotly.newPlot/addFrames/animate(...)
+PLOTLY_ID_REF_PATTERN = re.compile(
+    rf"""(<div id="|getElementById\(\s*["']|Plotly\.\w+\(\s*["'])({_UUID})(?=["'])"""
+)
 
 
-def strip_mathjax2_from_notebooks():
-    """Strip MathJax 2 script tags from all notebooks in _docs/notebooks/."""
-    for nb_path in Path("_docs/notebooks").rglob("*.ipynb"):
-        strip_mathjax2_from_notebook(nb_path)
+def _stabilize_html_ids(cell, cell_index):
+    """Replace the random UUIDs Plotly uses as div ids in ``text/html`` outputs
+    with ids derived from the cell's position. Figures are numbered across all
+    of the cell's outputs, so every figure in a cell keeps a distinct id. Only
+    the div id and Plotly's own references to it are rewritten; any other
+    UUID in the output is content and is left alone."""
+    mapping = {}
+    for output in cell.get("outputs", []):
+        html = output.get("data", {}).get("text/html")
+        if html is None:
+            continue
+        text = "".join(html) if isinstance(html, list) else html
+        div_ids = PLOTLY_DIV_PATTERN.findall(text)
+        if not div_ids:
+            continue
+        for uuid in div_ids:
+            mapping.setdefault(uuid, f"cell{cell_index}-fig{len(mapping)}")
+        text = PLOTLY_ID_REF_PATTERN.sub(
+            lambda m: m.group(1) + mapping.get(m.group(2), m.group(2)), text
+        )
+        output["data"]["text/html"] = (
+            text.splitlines(keepends=True) if isinstance(html, list) else text
+        )
 
 
-def stripped_notebooks_signature():
-    """A formatting-independent, MathJax-stripped content hash of every notebook
-    in ``_docs/notebooks``.
+def normalize_notebook(nb):
+    """Put a parsed notebook into canonical form (in place) and return it.
 
-    The upstream case-study tasks recopy these notebooks (with the
-    nondeterministic MathJax 2 tags that Plotly injects) into ``_docs/notebooks``
-    on *every* run, while ``compile_book`` strips those tags back out. If the raw
-    notebook bytes were used as a ``file_dep``, that tug-of-war would leave
-    ``compile_book`` permanently out-of-date. Hashing the notebooks *after*
-    stripping MathJax (and re-serializing canonically) yields a signature that is
-    identical whether the on-disk copy is the stripped or unstripped version, so
-    it only changes when the notebooks' real content changes."""
+    Strips Plotly's MathJax 2 tags, drops volatile metadata (execution timing,
+    papermill), replaces cell ids with ids derived from each cell's content,
+    renumbers execution counts 1..n, and stabilizes Plotly's random div ids."""
     import hashlib
 
-    parts = []
-    for nb_path in sorted(Path("_docs/notebooks").rglob("*.ipynb")):
-        with open(nb_path, "r", encoding="utf-8") as f:
-            nb = json.load(f)
-        _strip_mathjax2_in_notebook(nb)
-        parts.append(str(nb_path.relative_to("_docs")))
-        parts.append(json.dumps(nb, sort_keys=True, ensure_ascii=False))
-    return hashlib.md5("".join(parts).encode("utf-8")).hexdigest()
+    _strip_mathjax2_in_notebook(nb)
+
+    metadata = nb.get("metadata", {})
+    for key in VOLATILE_NOTEBOOK_METADATA:
+        metadata.pop(key, None)
+
+    has_cell_ids = (nb.get("nbformat"), nb.get("nbformat_minor", 0)) >= (4, 5)
+    seen_ids = set()
+    execution_count = 0
+    for i, cell in enumerate(nb.get("cells", [])):
+        cell_metadata = cell.get("metadata", {})
+        for key in VOLATILE_CELL_METADATA:
+            cell_metadata.pop(key, None)
+
+        if has_cell_ids:
+            source = cell.get("source", "")
+            source = "".join(source) if isinstance(source, list) else source
+            base = hashlib.sha1(
+                (cell["cell_type"] + "\0" + source).encode("utf-8")
+            ).hexdigest()[:8]
+            cell_id, n = base, 1
+            while cell_id in seen_ids:
+                n += 1
+                cell_id = f"{base}-{n}"
+            seen_ids.add(cell_id)
+            cell["id"] = cell_id
+
+        if cell["cell_type"] == "code":
+            if cell.get("execution_count") is not None:
+                execution_count += 1
+                cell["execution_count"] = execution_count
+            for output in cell.get("outputs", []):
+                if "execution_count" in output:
+                    output["execution_count"] = cell.get("execution_count")
+            _stabilize_html_ids(cell, i)
+    return nb
+
+
+def serialize_notebook(nb):
+    """Canonical serialization (matches nbformat's writer)."""
+    return json.dumps(nb, indent=1, sort_keys=True, ensure_ascii=False) + "\n"
+
+
+def copy_normalized_notebook(origin_path, destination_path):
+    """Copy a notebook in canonical form, leaving the destination untouched if
+    its content is already identical. Returns True if the file was written."""
+    origin_path = Path(origin_path)
+    destination_path = Path(destination_path)
+    with open(origin_path, "r", encoding="utf-8") as f:
+        nb = json.load(f)
+    text = serialize_notebook(normalize_notebook(nb))
+
+    if destination_path.exists():
+        with open(destination_path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    destination_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destination_path.with_name(f".{destination_path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    tmp.replace(destination_path)
+    return True
 
 
 ##################################
@@ -219,6 +388,27 @@ def stripped_notebooks_signature():
 ##################################
 
 
+def stage_docs():
+    """Put _docs on tmpfs behind a symlink with DOCS_BUILD_IN_RAM=True, or
+    back on disk otherwise (see src/docs_staging.py)."""
+    if DOCS_BUILD_IN_RAM:
+        use_ram_staging(Path("_docs"), config("BASE_DIR"))
+    else:
+        use_disk_staging(Path("_docs"))
+
+
+def task_docs_staging():
+    """Move _docs to or from tmpfs before any task writes to it.
+
+    Runs as an action rather than at import, so `doit list`, `doit clean` and
+    the like never move _docs. It always runs and is a no-op when _docs is
+    already where DOCS_BUILD_IN_RAM wants it."""
+    return {
+        "actions": [stage_docs],
+        "uptodate": [False],
+    }
+
+
 def task_config():
     """Create empty directories for data and output if they don't exist"""
     return {
@@ -231,6 +421,7 @@ def task_config():
             Path("_docs/notebooks/assets"),
         ],
         "file_dep": ["./src/settings.py"],
+        "task_dep": ["docs_staging"],
     }
 
 
@@ -255,23 +446,14 @@ def task_doit_fama_french():
         "actions": [
             run_case_study_fama_french_build,
             source_wrds_python_package_notebook,
-            *[
-                (
-                    copy_notebook_to_folder,
-                    (
-                        notebook,
-                        "../case_study_wrds_fama_french/_output/_notebook_build",
-                        Path("_docs/notebooks"),
-                    ),
-                )
-                for notebook in stems
-            ],
             (
-                copy_directory,
+                source_case_study_outputs,
                 (
-                    Path("../case_study_wrds_fama_french/src/assets"),
-                    Path("_docs/notebooks") / "assets",
+                    Path("../case_study_wrds_fama_french"),
+                    "_output/_notebook_build",
+                    stems,
                 ),
+                {"assets": True},
             ),
         ],
         "targets": [
@@ -283,6 +465,7 @@ def task_doit_fama_french():
             Path("_docs/notebooks") / "_06_CAPM_analysis_ipynb.ipynb",
             Path("_docs/notebooks") / "_07_Fama_French_3_factor_ipynb.ipynb",
         ],
+        "task_dep": ["docs_staging"],
         "verbosity": 2,  # Print everything immediately. This is important in
         # case WRDS asks for credentials.
     }
@@ -298,18 +481,11 @@ def task_doit_yield_curve():
 
     return {
         "actions": [
-            "doit -f ../case_study_yield_curve/dodo.py",
-            *[
-                (
-                    copy_notebook_to_folder,
-                    (
-                        notebook,
-                        "../case_study_yield_curve/_output",
-                        Path("_docs/notebooks"),
-                    ),
-                )
-                for notebook in stems
-            ],
+            traced_doit_command("-f", "../case_study_yield_curve/dodo.py"),
+            (
+                source_case_study_outputs,
+                (Path("../case_study_yield_curve"), "_output", stems),
+            ),
             # copy_directory,
             # (
             #     Path("../case_study_yield_curve/src/assets"),
@@ -320,6 +496,7 @@ def task_doit_yield_curve():
             Path("_docs/notebooks") / "01_CRSP_treasury_overview_ipynb.ipynb",
             Path("_docs/notebooks") / "02_replicate_GSW2005_ipynb.ipynb",
         ],
+        "task_dep": ["docs_staging"],
         "verbosity": 2,  # Print everything immediately. This is important in
         # case WRDS asks for credentials.
     }
@@ -335,30 +512,18 @@ def task_doit_options():
 
     return {
         "actions": [
-            "doit -f ../case_study_options/dodo.py",
-            *[
-                (
-                    copy_notebook_to_folder,
-                    (
-                        notebook,
-                        "../case_study_options/_output",
-                        Path("_docs/notebooks"),
-                    ),
-                )
-                for notebook in stems
-            ],
+            traced_doit_command("-f", "../case_study_options/dodo.py"),
             (
-                copy_directory,
-                (
-                    Path("../case_study_options/src/assets"),
-                    Path("_docs/notebooks") / "assets",
-                ),
+                source_case_study_outputs,
+                (Path("../case_study_options"), "_output", stems),
+                {"assets": True},
             ),
         ],
         "targets": [
             Path("_docs/notebooks") / "_01_corporate_hedging_ipynb.ipynb",
             Path("_docs/notebooks") / "_02_spx_hedging_ipynb.ipynb",
         ],
+        "task_dep": ["docs_staging"],
         "verbosity": 2,  # Print everything immediately. This is important in
         # case WRDS asks for credentials.
     }
@@ -379,22 +544,16 @@ def task_doit_clean_trace():
     return {
         "actions": [
             # f"START_DATE={CLEAN_TRACE_START} END_DATE={CLEAN_TRACE_END} doit -f ../case_study_clean_trace/dodo.py",
-            *[
-                (
-                    copy_notebook_to_folder,
-                    (
-                        notebook,
-                        "../case_study_clean_trace/_output",
-                        Path("_docs/notebooks"),
-                    ),
-                )
-                for notebook in stems
-            ],
+            (
+                source_case_study_outputs,
+                (Path("../case_study_clean_trace"), "_output", stems),
+            ),
         ],
         "targets": [
             Path("_docs/notebooks") / "_01_data_sources_overview_ipynb.ipynb",
             Path("_docs/notebooks") / "_02_trace_cleaning_walkthrough_ipynb.ipynb",
         ],
+        "task_dep": ["docs_staging"],
         "verbosity": 2,
     }
 
@@ -472,27 +631,13 @@ def copy_docs_src_to_docs():
 
 def copy_docs_build_to_docs():
     """
-    Copy all files and subdirectories from _docs/_build/html to docs.
-    This function copies each file individually while preserving the directory structure.
-    It does not delete any existing contents in docs.
-    After copying, it creates an empty .nojekyll file in the docs directory.
-    """
-    src = Path("_docs/_build/html")
-    dst = Path("docs")
-    dst.mkdir(parents=True, exist_ok=True)
+    Publish _docs/_build/html to docs (with an empty .nojekyll file).
 
-    # Loop through all files and directories in src
-    for item in src.rglob("*"):
-        relative_path = item.relative_to(src)
-        target = dst / relative_path
-        if item.is_dir():
-            target.mkdir(parents=True, exist_ok=True)
-        else:
-            target.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(item, target)
-
-    # Touch an empty .nojekyll file in the docs directory.
-    (dst / ".nojekyll").touch()
+    The new tree is copied next to docs and swapped in at once (see
+    src/docs_staging.py), so an interrupted build never leaves docs
+    half-updated and pages that are no longer built are removed.
+    """
+    publish_directory(Path("_docs/_build/html"), Path("docs"), touch=[".nojekyll"])
 
 
 def task_compile_book():
@@ -502,21 +647,24 @@ def task_compile_book():
 
     return {
         "actions": [
-            strip_mathjax2_from_notebooks,
             copy_docs_src_to_docs,
             "sphinx-build -M html ./_docs/ ./_docs/_build",
+            # Move inline Plotly figure data into lazily loaded files
+            (externalize_plotly_figures, (Path("_docs/_build/html"),)),
+            # Serve require.js, MathJax, and Plotly from _static instead of CDNs
+            (
+                vendor_cdn_scripts,
+                (Path("_docs/_build/html"), OUTPUT_DIR / "_vendor_cache"),
+            ),
             copy_docs_build_to_docs,
         ],
         "targets": targets,
-        # Only the (stable) markdown sources are tracked as file_dep. The
-        # notebooks under _docs/notebooks are intentionally *not* listed here:
-        # upstream tasks recopy them (with nondeterministic MathJax 2 tags) on
-        # every run while this task strips those tags back out, so their raw
-        # bytes flip every build and would make this task never up-to-date.
-        # Their real content is tracked via the stripped-content signature below.
-        "file_dep": book_source_md_files,
-        "uptodate": [config_changed(stripped_notebooks_signature())],
+        # The notebooks are normalized when upstream tasks copy them in and are
+        # only rewritten when their content changes, so their bytes are stable
+        # enough to track directly.
+        "file_dep": book_source_files,
         "task_dep": [
+            "docs_staging",
             "doit_fama_french",
             "doit_yield_curve",
             "doit_options",
@@ -526,6 +674,48 @@ def task_compile_book():
     }
 
 
+## Per-page weight budgets for the built HTML (see src/page_weight.py). Every
+## matching pattern applies, later ones overriding earlier ones.
+PAGE_WEIGHT_BUDGETS = {
+    "*": {
+        "total_bytes": 5_000_000,
+        "inline_script_bytes": 2_000_000,
+        "image_bytes": 3_000_000,
+        "external_requests": 10,
+    },
+    "notebooks/*": {
+        "total_bytes": 20_000_000,
+        "inline_script_bytes": 15_000_000,
+        "image_bytes": 10_000_000,
+    },
+}
+
+
+def task_page_weight_report():
+    """Measure the weight of every built page and enforce PAGE_WEIGHT_BUDGETS.
+
+    Writes _output/page_weight.json and a sortable _output/page_weight.html,
+    and fails (blocking the copy to the GitHub Pages repo) if a page is over
+    budget."""
+    return {
+        "actions": [
+            (
+                build_page_weight_report,
+                (Path("_docs/_build/html"), OUTPUT_DIR, PAGE_WEIGHT_BUDGETS),
+            )
+        ],
+        "targets": [
+            OUTPUT_DIR / "page_weight.json",
+            OUTPUT_DIR / "page_weight.html",
+        ],
+        "file_dep": [Path("_docs/_build/html") / page for page in book_compiled],
+        "uptodate": [config_changed(PAGE_WEIGHT_BUDGETS)],
+        "task_dep": ["compile_book"],
+        "clean": True,
+        "verbosity": 2,
+    }
+
+
 def copy_docs_to_github_pages_repo():
     # shutil.rmtree(GITHUB_PAGES_REPO_DIR, ignore_errors=True)
     # shutil.copytree(BUILD_DIR, GITHUB_PAGES_REPO_DIR)
@@ -559,6 +749,53 @@ def task_copy_compiled_book_to_github_pages_repo():
         ],
         "targets": targets,
         "file_dep": file_dep,
-        "task_dep": ["compile_book"],
+        "task_dep": ["compile_book", "page_weight_report"],
+        "clean": True,
+    }
+
+
+# ###############################################################
+# ## PDF (LaTeX) build
+# ###############################################################
+
+
+def task_pdf_chapter():
+    """Compile each chapter to its own PDF (see src/pdf_build.py).
+
+    Every chapter is a separate subtask, so only chapters whose pages, support
+    files, or linked notebooks changed are rebuilt. Run with ``doit -n 4 pdf``
+    to compile stale chapters in parallel."""
+    for chapter in pdf_build.CHAPTERS:
+        _, notebooks = pdf_build.chapter_documents(chapter)
+        yield {
+            "name": chapter,
+            "actions": [(pdf_build.compile_chapter, (chapter,))],
+            "targets": [pdf_build.chapter_pdf_path(chapter)],
+            "file_dep": [
+                *pdf_build.chapter_file_dep(chapter),
+                *[nb for nb in notebooks if nb.exists()],
+            ],
+            "task_dep": [
+                "docs_staging",
+                "doit_fama_french",
+                "doit_yield_curve",
+                "doit_options",
+                "doit_clean_trace",
+            ],
+            "clean": True,
+            "verbosity": 2,
+        }
+
+
+def task_pdf():
+    """Assemble the chapter PDFs into _docs/_build/pdf/book.pdf and report
+    per-chapter compile times."""
+    return {
+        "actions": [pdf_build.assemble_book],
+        "targets": [pdf_build.PDF_BUILD_DIR / "book.pdf"],
+        "file_dep": [
+            pdf_build.chapter_pdf_path(chapter) for chapter in pdf_build.CHAPTERS
+        ],
         "clean": True,
+        "verbosity": 2,
     }
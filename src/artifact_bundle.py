@@ -0,0 +1,286 @@
+"""Single-file, zstd-compressed bundles of case-study outputs.
+
+A case study publishes everything the textbook needs (executed notebooks and
+``src/assets``) as one ``.tar.zst`` bundle plus a small JSON index next to it:
+
+- ``<name>.tar.zst``: a tar stream whose *first* member is ``MANIFEST.json``
+  (format version, producer version, and the SHA-256 and size of every
+  member), followed by the members themselves.
+- ``<name>.index.json``: the same manifest plus the SHA-256 of the bundle file
+  itself, so a consumer can tell whether anything changed without opening the
+  bundle.
+
+On the textbook side, ``import_bundle`` skips the bundle entirely if the hash
+in its index and the bundle file's size and mtime all match the last import.
+Otherwise it makes one streaming pass over the bundle, extracting only
+members whose content changed, verifying every member and the bundle as a
+whole against the manifest and index, and only then moving the new files
+into place.
+
+Bundles can be created from Python (``create_bundle``) or from the command
+line::
+
+    python src/artifact_bundle.py create _output/textbook_bundle.tar.zst \\
+        --version 2026-07 notebooks=_output/_notebook_build assets=src/assets
+"""
+
+import hashlib
+import io
+import json
+import os
+import tarfile
+from pathlib import Path
+
+import zstandard
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_NAME = "MANIFEST.json"
+STATE_NAME = ".bundle_state.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json(data, path):
+    """Write JSON through a temporary file, so readers never see a partial
+    file."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def _bundle_stat(bundle_path):
+    st = Path(bundle_path).stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def index_path_for(bundle_path):
+    bundle_path = Path(bundle_path)
+    name = bundle_path.name.removesuffix(".zst").removesuffix(".tar")
+    return bundle_path.with_name(name + ".index.json")
+
+
+class _HashingReader:
+    """File-like wrapper that hashes every byte read through it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.sha256.update(data)
+        return data
+
+
+def create_bundle(members, bundle_path, version="", level=10):
+    """Write a bundle.
+
+    Args:
+        members: mapping of archive name (e.g. ``"notebooks/x.ipynb"``) to the
+            path of the file to include
+        bundle_path: path of the ``.tar.zst`` file to write
+        version: free-form producer version recorded in the manifest
+        level: zstd compression level
+
+    Returns:
+        dict: the index that was written next to the bundle
+    """
+    bundle_path = Path(bundle_path)
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    members = {name: Path(path) for name, path in sorted(members.items())}
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": version,
+        "members": {
+            name: {"sha256": _sha256_file(path), "size": path.stat().st_size}
+            for name, path in members.items()
+        },
+    }
+
+    tmp = bundle_path.with_name(f".{bundle_path.name}.tmp")
+    cctx = zstandard.ZstdCompressor(level=level)
+    with open(tmp, "wb") as raw, cctx.stream_writer(raw) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w|") as tar:
+            manifest_bytes = json.dumps(manifest, indent=1, sort_keys=True).encode()
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(manifest_bytes)
+            tar.addfile(info, io.BytesIO(manifest_bytes))
+            for name, path in members.items():
+                # Normalize metadata so identical inputs give identical bundles
+                info = tar.gettarinfo(str(path), arcname=name)
+                info.mtime = 0
+                info.uid = info.gid = 0
+                info.uname = info.gname = ""
+                with open(path, "rb") as f:
+                    tar.addfile(info, f)
+    os.replace(tmp, bundle_path)
+
+    index = {**manifest, "bundle_sha256": _sha256_file(bundle_path)}
+    _write_json(index, index_path_for(bundle_path))
+    return index
+
+
+def create_bundle_from_dirs(dirs, bundle_path, version=""):
+    """Bundle whole directories, e.g. ``{"notebooks": ..., "assets": ...}``.
+    Each directory's files are stored under its prefix."""
+    members = {}
+    for prefix, directory in dirs.items():
+        directory = Path(directory)
+        for p in sorted(directory.rglob("*")):
+            if p.is_file() and p.name != ".DS_Store":
+                members[f"{prefix}/{p.relative_to(directory).as_posix()}"] = p
+    return create_bundle(members, bundle_path, version=version)
+
+
+def _load_json(path, default):
+    path = Path(path)
+    if not path.exists():
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def import_bundle(bundle_path, dest_dir):
+    """Bring ``dest_dir`` in sync with a bundle, touching only changed members.
+
+    Returns a dict with lists of ``extracted``, ``removed`` and ``unchanged``
+    member names, and ``skipped=True`` when neither the bundle file (size and
+    mtime) nor the hash in its index changed since the last import.
+    Raises ``ValueError`` if the bundle doesn't match its manifest or index.
+    """
+    bundle_path = Path(bundle_path)
+    dest_dir = Path(dest_dir)
+    index = _load_json(index_path_for(bundle_path), None)
+    if index is None:
+        raise FileNotFoundError(f"No index found for bundle {bundle_path}")
+    if index.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported bundle format {index.get('format_version')} in "
+            f"{bundle_path}; expected {BUNDLE_FORMAT_VERSION}"
+        )
+
+    for name in index["members"]:
+        parts = Path(name).parts
+        if Path(name).is_absolute() or ".." in parts or name == STATE_NAME:
+            raise ValueError(f"{bundle_path}: refusing unsafe member name {name!r}")
+
+    state_path = dest_dir / STATE_NAME
+    state = _load_json(state_path, {"bundle_sha256": None, "members": {}})
+    bundle_stat = _bundle_stat(bundle_path)
+    all_present = all((dest_dir / name).exists() for name in index["members"])
+    if (
+        state["bundle_sha256"] == index["bundle_sha256"]
+        and state.get("bundle_stat") == bundle_stat
+        and all_present
+    ):
+        return {"skipped": True, "extracted": [], "removed": [], "unchanged": []}
+
+    wanted = {
+        name: meta["sha256"]
+        for name, meta in index["members"].items()
+        if state["members"].get(name) != meta["sha256"]
+        or not (dest_dir / name).exists()
+    }
+
+    ## One streaming pass: decompress, verify, and stage changed members
+    staged = {}
+    try:
+        with open(bundle_path, "rb") as raw:
+            hashing = _HashingReader(raw)
+            dctx = zstandard.ZstdDecompressor()
+            with dctx.stream_reader(hashing) as stream:
+                with tarfile.open(fileobj=stream, mode="r|") as tar:
+                    first = True
+                    for member in tar:
+                        if first:
+                            if member.name != MANIFEST_NAME:
+                                raise ValueError(
+                                    f"{bundle_path}: first member must be "
+                                    f"{MANIFEST_NAME}"
+                                )
+                            manifest = json.load(tar.extractfile(member))
+                            if manifest["members"] != index["members"]:
+                                raise ValueError(
+                                    f"{bundle_path}: manifest does not match index"
+                                )
+                            first = False
+                            continue
+                        if member.name not in wanted or not member.isfile():
+                            continue
+                        target = dest_dir / member.name
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        tmp = target.with_name(f".{target.name}.bundle-tmp")
+                        staged[member.name] = tmp
+                        h = hashlib.sha256()
+                        src = tar.extractfile(member)
+                        with open(tmp, "wb") as out:
+                            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                                h.update(chunk)
+                                out.write(chunk)
+                        if h.hexdigest() != wanted[member.name]:
+                            raise ValueError(
+                                f"{bundle_path}: checksum mismatch for {member.name}"
+                            )
+            # Hash whatever trails the last tar block so the whole file is covered
+            for _ in iter(lambda: hashing.read(CHUNK_SIZE), b""):
+                pass
+        if hashing.sha256.hexdigest() != index["bundle_sha256"]:
+            raise ValueError(f"{bundle_path}: bundle hash does not match its index")
+        missing = set(wanted) - set(staged)
+        if missing:
+            raise ValueError(f"{bundle_path}: missing members {sorted(missing)}")
+    except BaseException:
+        for tmp in staged.values():
+            tmp.unlink(missing_ok=True)
+        raise
+
+    ## Everything verified: move new members into place, drop stale ones
+    for name, tmp in staged.items():
+        os.replace(tmp, dest_dir / name)
+    removed = []
+    for name in state["members"]:
+        if name not in index["members"]:
+            (dest_dir / name).unlink(missing_ok=True)
+            removed.append(name)
+
+    state = {
+        "bundle_sha256": index["bundle_sha256"],
+        "bundle_stat": bundle_stat,
+        "version": index.get("version", ""),
+        "members": {name: meta["sha256"] for name, meta in index["members"].items()},
+    }
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    _write_json(state, state_path)
+
+    return {
+        "skipped": False,
+        "extracted": sorted(staged),
+        "removed": removed,
+        "unchanged": sorted(set(index["members"]) - set(staged)),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="create a bundle from directories")
+    create.add_argument("bundle")
+    create.add_argument("--version", default="")
+    create.add_argument("dirs", nargs="+", metavar="PREFIX=DIR")
+    args = parser.parse_args()
+
+    dirs = dict(item.split("=", 1) for item in args.dirs)
+    index = create_bundle_from_dirs(dirs, args.bundle, version=args.version)
+    print(f"Wrote {args.bundle} ({len(index['members'])} members)")
@@ -0,0 +1,236 @@
+"""Content-addressed storage for the notebook assets pulled in from the case
+studies.
+
+Several case-study repos ship a ``src/assets`` directory, and all of them land
+in the same ``_docs/notebooks/assets`` folder. Rather than copying each tree
+over the previous one, every file is stored once under its content hash in an
+object store and then hard-linked (or, where links aren't possible, copied)
+into place. Each source (a case study, identified by a stable name rather than
+by where its assets happen to be read from) records the relative paths it
+claimed in its own JSON manifest under ``manifests/``. Files a source stops
+shipping are removed from the destination. Ingesting a source checks its files
+against the other sources' manifests, so two case studies shipping
+*different* files under the *same* name are reported instead of silently
+overwriting each other. The published file in a collision is always the one
+from the source that sorts first, whatever order the sources are ingested
+in, and a destination that already holds it is left alone. Case studies can
+be ingested by parallel doit tasks: each writes only its own manifest, the
+claim-and-link step runs under a lock on the store, and every file is written
+under a unique temporary name and moved into place.
+
+Meant to be used as an imported module (see ``dodo.py``).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def object_path(store_dir, digest):
+    """Location of a blob in the object store, fanned out by digest prefix."""
+    return Path(store_dir) / "objects" / digest[:2] / digest[2:]
+
+
+def _unique_tmp(path):
+    """Unique temporary path next to ``path``, for an atomic ``os.replace``."""
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    os.close(fd)
+    return Path(tmp)
+
+
+def store_blob(path, store_dir, digest=None):
+    """Write ``path`` into the object store unless a blob with the same content
+    already exists. Returns ``(digest, blob_path, written)``."""
+    digest = digest or file_digest(path)
+    blob = object_path(store_dir, digest)
+    if blob.exists():
+        return digest, blob, False
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _unique_tmp(blob)
+    shutil.copy2(path, tmp)
+    os.replace(tmp, blob)
+    return digest, blob, True
+
+
+def link_into_place(blob, dest, digest):
+    """Hard-link ``blob`` to ``dest``, falling back to a copy (e.g. across
+    devices or on filesystems without hard links). An existing ``dest`` with
+    the same content is left untouched so its mtime stays stable, whether it
+    was linked or copied."""
+    dest = Path(dest)
+    if dest.exists() and (
+        os.path.samefile(blob, dest)
+        or (dest.stat().st_size == blob.stat().st_size and file_digest(dest) == digest)
+    ):
+        return False
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _unique_tmp(dest)
+    tmp.unlink()
+    try:
+        os.link(blob, tmp)
+    except OSError:
+        shutil.copy2(blob, tmp)
+    os.replace(tmp, dest)
+    return True
+
+
+@contextmanager
+def store_lock(store_dir):
+    """Exclusive lock on the store, held while a source claims and links its
+    files, so parallel ingests see each other's manifests."""
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with open(store_dir / ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def manifest_path_for(store_dir, source_name):
+    """Per-source manifest, so parallel ingests never write the same file."""
+    return Path(store_dir) / "manifests" / f"{source_name}.json"
+
+
+def load_manifest(manifest_path):
+    manifest_path = Path(manifest_path)
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_other_manifests(store_dir, source_name):
+    """Map each relative path claimed by another source to its
+    ``(source, digest)`` pairs."""
+    claims = {}
+    for path in sorted((Path(store_dir) / "manifests").glob("*.json")):
+        manifest = load_manifest(path)
+        if manifest.get("source") != path.stem:
+            path.unlink()  # keyed by an old naming scheme; its source re-claims
+            continue
+        if manifest["source"] == source_name:
+            continue
+        for rel, digest in manifest.get("files", {}).items():
+            claims.setdefault(rel, []).append((manifest["source"], digest))
+    return claims
+
+
+def save_manifest(manifest, manifest_path):
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _unique_tmp(manifest_path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, manifest_path)
+
+
+def ingest_assets(source_dir, dest_dir, store_dir, source_name):
+    """Ingest every file under ``source_dir`` into the object store and link it
+    to the same relative path under ``dest_dir``.
+
+    The manifest of ``source_name`` maps each relative path it claims in
+    ``dest_dir`` to the file's digest. Paths it claimed on the previous ingest
+    but no longer ships are removed from ``dest_dir`` (or handed to another
+    source that claims them). If other sources' manifests claim the same path
+    with different content, the collision is reported and the file from the
+    source that sorts first is published, so the result doesn't depend on
+    the order the case studies are ingested in.
+
+    Returns a dict with the ``written``, ``linked``, ``unchanged``, ``removed``
+    counts and a list of ``collisions``.
+    """
+    source_dir = Path(source_dir)
+    dest_dir = Path(dest_dir)
+    store_dir = Path(store_dir)
+    manifest_path = manifest_path_for(store_dir, source_name)
+
+    files = {}
+    stats = {
+        "written": 0,
+        "linked": 0,
+        "unchanged": 0,
+        "removed": 0,
+        "collisions": [],
+    }
+    for item in sorted(source_dir.rglob("*")):
+        if not item.is_file() or item.name == ".DS_Store":
+            continue
+        rel = item.relative_to(source_dir).as_posix()
+        digest, _, written = store_blob(item, store_dir)
+        stats["written"] += written
+        files[rel] = digest
+
+    with store_lock(store_dir):
+        others = load_other_manifests(store_dir, source_name)
+        for rel, digest in files.items():
+            claims = sorted([(source_name, digest), *others.get(rel, [])])
+            winner, winning_digest = claims[0]
+            if any(d != digest for _, d in claims):
+                stats["collisions"].append(
+                    {"path": rel, "winner": winner, "claims": claims}
+                )
+            blob = object_path(store_dir, winning_digest)
+            if winner != source_name and not blob.exists():
+                continue  # the winning source restores it on its next ingest
+            if link_into_place(blob, dest_dir / rel, winning_digest):
+                stats["linked"] += 1
+            else:
+                stats["unchanged"] += 1
+
+        previous = load_manifest(manifest_path).get("files", {})
+        for rel in sorted(set(previous) - set(files)):
+            claims = sorted(others.get(rel, []))
+            if claims and object_path(store_dir, claims[0][1]).exists():
+                link_into_place(
+                    object_path(store_dir, claims[0][1]), dest_dir / rel, claims[0][1]
+                )
+            elif not claims:
+                (dest_dir / rel).unlink(missing_ok=True)
+                stats["removed"] += 1
+
+        save_manifest({"source": source_name, "files": files}, manifest_path)
+
+    for c in stats["collisions"]:
+        claims = ", ".join(f"{src} ({d[:12]})" for src, d in c["claims"])
+        print(
+            f"WARNING: asset name collision at {c['path']} between {claims}; "
+            f"publishing the file from {c['winner']}"
+        )
+    print(
+        f"Ingested assets from {source_dir}: {stats['written']} new blob(s), "
+        f"{stats['linked']} linked, {stats['unchanged']} unchanged, "
+        f"{stats['removed']} removed, {len(stats['collisions'])} collision(s)"
+    )
+    return stats
@@ -0,0 +1,262 @@
+"""Cross-process build tracing for doit pipelines.
+
+The textbook build runs nested ``doit -f ../case_study_*/dodo.py`` pipelines
+in subprocesses, whose timing is invisible from the top-level run. With
+tracing enabled (``BUILD_TRACE=True`` in ``.env``), every doit process taking
+part in the build appends spans to one shared JSON-lines file:
+
+- ``start_trace`` (called from ``dodo.py``) creates the trace file and exports
+  its location in ``BUILD_TRACE_FILE``, so child processes inherit it.
+- ``TraceReporter`` wraps doit's console reporter and writes one span per
+  task and one per action. While an action runs, its span id is exported in
+  ``BUILD_TRACE_PARENT`` so spans written by children can point back to it.
+- Nested pipelines are launched with ``traced_doit_command(...)``, which runs
+  doit through this module so the child uses ``TraceReporter`` too, without
+  any change to the case-study repos.
+
+When the top-level run finishes, the spans are merged into a Chrome trace /
+Perfetto JSON file (``build_trace.json``, open it in https://ui.perfetto.dev)
+and the critical path through the top-level task graph is printed.
+
+Spans are written with ``O_APPEND`` in a single ``write`` call per line, so
+concurrent writers don't interleave. Action spans are only recorded for tasks
+executed in the reporter's process (not under ``doit -n`` with processes).
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from doit.reporter import ConsoleReporter
+
+TRACE_FILE_ENV = "BUILD_TRACE_FILE"
+TRACE_PARENT_ENV = "BUILD_TRACE_PARENT"
+
+
+def _now_us():
+    return time.time_ns() // 1000
+
+
+def _new_span_id():
+    return uuid.uuid4().hex[:16]
+
+
+def write_event(event, trace_file=None):
+    """Append one trace event to the shared trace file."""
+    trace_file = trace_file or os.environ.get(TRACE_FILE_ENV)
+    if not trace_file:
+        return
+    line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+    fd = os.open(trace_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def start_trace(trace_file):
+    """Start a new trace at ``trace_file`` unless this process is already part
+    of one (i.e. it was launched by a traced parent)."""
+    if os.environ.get(TRACE_FILE_ENV):
+        return
+    trace_file = Path(trace_file).resolve()
+    trace_file.parent.mkdir(parents=True, exist_ok=True)
+    trace_file.write_bytes(b"")
+    os.environ[TRACE_FILE_ENV] = str(trace_file)
+
+
+def traced_doit_command(*args):
+    """Command list for running a nested doit pipeline.
+
+    If a trace is active, doit is launched through this module so the child
+    reports its tasks and actions into the same trace; otherwise this is just
+    ``["doit", *args]``."""
+    if os.environ.get(TRACE_FILE_ENV):
+        return [sys.executable, str(Path(__file__).resolve()), *map(str, args)]
+    return ["doit", *map(str, args)]
+
+
+def _span(name, cat, start_us, end_us, span_id, parent_id, **args):
+    return {
+        "name": name,
+        "cat": cat,
+        "ph": "X",
+        "ts": start_us,
+        "dur": max(end_us - start_us, 0),
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+        "args": {"span_id": span_id, "parent_id": parent_id, **args},
+    }
+
+
+class TracedAction:
+    """Proxy around a doit action that records a span for its execution."""
+
+    def __init__(self, action, task_name, task_span_id):
+        self._action = action
+        self._task_name = task_name
+        self._task_span_id = task_span_id
+
+    def __getattr__(self, name):
+        return getattr(self._action, name)
+
+    def execute(self, out=None, err=None):
+        span_id = _new_span_id()
+        previous_parent = os.environ.get(TRACE_PARENT_ENV)
+        os.environ[TRACE_PARENT_ENV] = span_id
+        start = _now_us()
+        try:
+            return self._action.execute(out, err)
+        finally:
+            end = _now_us()
+            if previous_parent is None:
+                os.environ.pop(TRACE_PARENT_ENV, None)
+            else:
+                os.environ[TRACE_PARENT_ENV] = previous_parent
+            write_event(
+                _span(
+                    str(self._action)[:200],
+                    "action",
+                    start,
+                    end,
+                    span_id,
+                    self._task_span_id,
+                    task=self._task_name,
+                )
+            )
+
+    def __str__(self):
+        return str(self._action)
+
+
+class TraceReporter(ConsoleReporter):
+    """Console reporter that also writes task and action spans to the trace.
+
+    The process that started the trace (no ``BUILD_TRACE_PARENT`` in its
+    environment) merges the spans into ``build_trace.json`` when it finishes.
+    """
+
+    desc = "console output plus build trace spans"
+
+    def __init__(self, outstream, options):
+        super().__init__(outstream, options)
+        self.parent_id = os.environ.get(TRACE_PARENT_ENV)
+        self.is_root = self.parent_id is None
+        self.tasks = {}
+        self.started = {}
+        self.durations = {}
+        write_event(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "args": {"name": " ".join(["doit", *sys.argv[1:]])},
+            }
+        )
+
+    def initialize(self, tasks, selected_tasks):
+        super().initialize(tasks, selected_tasks)
+        self.tasks = tasks
+
+    def execute_task(self, task):
+        super().execute_task(task)
+        span_id = _new_span_id()
+        self.started[task.name] = (_now_us(), span_id)
+        task._action_instances = [
+            TracedAction(action, task.name, span_id) for action in task.actions
+        ]
+
+    def _finish_task(self, task, status):
+        if task.name not in self.started:
+            return
+        start, span_id = self.started.pop(task.name)
+        end = _now_us()
+        self.durations[task.name] = end - start
+        write_event(
+            _span(task.name, "task", start, end, span_id, self.parent_id, status=status)
+        )
+
+    def add_success(self, task):
+        super().add_success(task)
+        self._finish_task(task, "success")
+
+    def add_failure(self, task, fail):
+        super().add_failure(task, fail)
+        self._finish_task(task, "failure")
+
+    def complete_run(self):
+        super().complete_run()
+        if self.is_root and os.environ.get(TRACE_FILE_ENV):
+            trace_file = Path(os.environ[TRACE_FILE_ENV])
+            critical = critical_path(self.tasks, self.durations)
+            merge_trace(trace_file, trace_file.with_suffix(".json"), critical)
+            print_critical_path(critical, self.durations, self.outstream)
+
+
+def critical_path(tasks, durations):
+    """Longest chain (by executed time) through the ``task_dep`` graph.
+    Up-to-date tasks count as zero."""
+    memo = {}
+
+    def visit(name, stack=()):
+        if name in memo:
+            return memo[name]
+        best = (0, [])
+        task = tasks.get(name)
+        for dep in getattr(task, "task_dep", []) if task else []:
+            if dep in stack:
+                continue
+            cost, chain = visit(dep, stack + (name,))
+            if cost > best[0]:
+                best = (cost, chain)
+        memo[name] = (best[0] + durations.get(name, 0), best[1] + [name])
+        return memo[name]
+
+    if not tasks:
+        return []
+    return max((visit(name) for name in tasks), key=lambda r: r[0])[1]
+
+
+def print_critical_path(chain, durations, outstream=sys.stdout):
+    total = sum(durations.get(name, 0) for name in chain)
+    outstream.write(f"Critical path ({total / 1e6:.1f}s):\n")
+    for name in chain:
+        outstream.write(f"  {durations.get(name, 0) / 1e6:8.1f}s  {name}\n")
+
+
+def merge_trace(trace_file, output_file, critical=()):
+    """Convert the JSON-lines span file into a Chrome trace / Perfetto JSON
+    document. Tasks on the critical path get ``"critical_path": true``."""
+    events = []
+    with open(trace_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    critical = list(critical)
+    for event in events:
+        if event.get("cat") == "task" and event["name"] in critical:
+            event["args"]["critical_path"] = True
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": {"critical_path": critical},
+            },
+            f,
+        )
+    return output_file
+
+
+if __name__ == "__main__":
+    ## Launcher for nested pipelines: `python build_trace.py -f ../x/dodo.py`
+    from doit.doit_cmd import DoitMain
+
+    sys.exit(
+        DoitMain(extra_config={"run": {"reporter": TraceReporter}}).run(sys.argv[1:])
+    )
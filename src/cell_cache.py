@@ -0,0 +1,768 @@
+"""Cell-level memoization for executing Jupyter notebooks.
+
+``nbconvert --execute`` re-runs every cell of a notebook, including the WRDS
+and data-loading cells that dominate runtime, even when only the last chart
+changed. ``execute_notebook`` executes a notebook in place like
+``nbconvert --execute --inplace`` does, but caches each code cell:
+
+- A cell's key hashes its source together with the key of the cell before it
+  (a cell can depend on anything that ran before it, so every earlier cell is
+  a dependency) and the contents of any inputs declared with a
+  ``# cell-cache: inputs=path, ...`` comment. Files the cell opens for reading
+  at runtime are recorded through an audit hook in the kernel and checked
+  again on lookup.
+- After a cell runs, its outputs and a snapshot of the kernel's state are
+  stored. DataFrames are written as Parquet and other variables (lambdas and
+  ``functools.partial`` objects included) are pickled with cloudpickle. Only
+  variables that are new, rebound or mentioned in the cell are saved again;
+  the others keep the blob from the previous snapshot. Process-wide state is
+  snapshotted too: the ``random`` and NumPy global RNG states, pandas
+  options, matplotlib rcParams, environment variables and the working
+  directory. Blobs are content-addressed, so a variable that doesn't change
+  is stored once.
+- On the next run the longest prefix of unchanged cells is restored: outputs
+  come from the cache and, if a later cell needs to run, the kernel state is
+  rebuilt from the snapshot. Imports, ``def``/``class`` statements and a few
+  setup calls such as ``sys.path`` changes are replayed from the cached
+  cells' source, because those can't be pickled. Variables that couldn't be
+  pickled, such as a ``wrds.Connection``, are rebuilt by replaying the
+  assignment that created them (side effects of that statement happen
+  again). Editing the last chart re-executes only that cell.
+- A cached cell that changes any other module state at top level (say
+  ``sys.setrecursionlimit(...)`` or ``logging.basicConfig(...)``) can't be
+  restored faithfully, so the notebook is re-executed from the top instead.
+  The same happens if restoring fails, or if a variable couldn't be rebuilt
+  and a cell that still has to run uses it. An error in a cell that runs is
+  raised as usual. State changed inside user-defined functions isn't
+  detected.
+
+A cell with a ``# cell-cache: off`` comment is always executed, and so is
+every cell after it. Entries not used for ``max_age_days`` are evicted, then
+the least recently used ones until the cache fits in ``max_bytes``.
+
+Run as a script through ``jupyter_execute_notebook`` in ``dodo.py``. The
+textbook's own tasks don't execute notebooks (the case-study pipelines do),
+so the cache only takes effect in tasks that use that helper::
+
+    python ./src/cell_cache.py ./src/notebook.ipynb --cache-dir _output/_cell_cache
+"""
+
+import ast
+import hashlib
+import json
+import os
+import pickle
+import random
+import re
+import sys
+import time
+import types
+import warnings
+from pathlib import Path
+
+from asset_store import file_digest
+
+PRAGMA_PATTERN = re.compile(r"^\s*#\s*cell-cache:\s*(.*?)\s*$", re.MULTILINE)
+RESULT_MARKER = "__cell_cache_result__"
+
+## Top-level calls replayed (with imports and definitions) when rebuilding
+## the kernel state from a snapshot
+REPLAY_CALL_PREFIXES = (
+    "sys.path.",
+    "os.chdir",
+    "get_ipython().run_line_magic",
+    "warnings.",
+    "pd.set_option",
+    "pandas.set_option",
+    "plt.style.use",
+    "matplotlib.use",
+)
+## Module state captured by the snapshot (see ``_capture_global_state``), as
+## fully qualified prefixes; cached cells may change it freely
+CAPTURED_STATE_PREFIXES = (
+    "random.",
+    "numpy.random.",
+    "pandas.options.",
+    "pandas.set_option",
+    "pandas.reset_option",
+    "matplotlib.",
+    "seaborn.",
+    "os.environ",
+    "os.chdir",
+)
+REPLAY_NODE_TYPES = (
+    ast.Import,
+    ast.ImportFrom,
+    ast.FunctionDef,
+    ast.AsyncFunctionDef,
+    ast.ClassDef,
+)
+
+
+## Cache keys and entries
+def parse_pragmas(source):
+    """Return ``(enabled, inputs)`` from a cell's ``# cell-cache:`` comments."""
+    enabled = True
+    inputs = []
+    for directive in PRAGMA_PATTERN.findall(source):
+        if directive == "off":
+            enabled = False
+        elif directive.startswith("inputs="):
+            inputs.extend(
+                p.strip() for p in directive[len("inputs=") :].split(",") if p.strip()
+            )
+    return enabled, inputs
+
+
+def cell_keys(nb, notebook_dir):
+    """Cache key for each code cell, indexed like ``nb.cells``. Cells from the
+    first ``# cell-cache: off`` cell onwards get ``None``."""
+    keys = {}
+    previous = hashlib.sha256(b"cell-cache-v2").hexdigest()
+    for index, cell in enumerate(nb.cells):
+        if cell.cell_type != "code":
+            continue
+        enabled, inputs = parse_pragmas(cell.source)
+        if previous is None or not enabled:
+            previous = None
+            keys[index] = None
+            continue
+        h = hashlib.sha256()
+        h.update(previous.encode())
+        h.update(cell.source.encode("utf-8"))
+        for name in inputs:
+            path = (Path(notebook_dir) / name).resolve()
+            digest = file_digest(path) if path.is_file() else "missing"
+            h.update(f"\0{path}\0{digest}".encode())
+        previous = keys[index] = h.hexdigest()
+    return keys
+
+
+def _entry_blobs(entry):
+    return {spec["blob"] for spec in entry["variables"].values()} | {
+        entry["state"]["blob"]
+    }
+
+
+class CellCache:
+    """On-disk store of cell entries (``entries/<key>.json``) and the
+    variable blobs they reference (``blobs/``)."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir).resolve()  # the kernel runs elsewhere
+        self.entries_dir = self.cache_dir / "entries"
+        self.blob_dir = self.cache_dir / "blobs"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, key):
+        return self.entries_dir / f"{key}.json"
+
+    def lookup(self, key):
+        """Return the entry for ``key`` if it exists, its blobs are present
+        and the files it read are unchanged."""
+        if key is None:
+            return None
+        path = self._entry_path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        for name, digest in entry["inputs"].items():
+            if not Path(name).is_file() or file_digest(name) != digest:
+                return None
+        for blob in _entry_blobs(entry):
+            if not (self.blob_dir / blob).is_file():
+                return None
+        os.utime(path)  # entry mtime is its last use, for eviction
+        return entry
+
+    def store(self, key, outputs, snapshot):
+        entry = {
+            "outputs": outputs,
+            "variables": snapshot["variables"],
+            "state": snapshot["state"],
+            "unsaved": snapshot["unsaved"],
+            "inputs": {name: file_digest(name) for name in sorted(snapshot["inputs"])},
+        }
+        path = self._entry_path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def evict(self, max_bytes, max_age_days):
+        """Drop entries unused for ``max_age_days``, then least recently used
+        entries until entries and referenced blobs fit in ``max_bytes``.
+        Unreferenced blobs are removed."""
+        now = time.time()
+        entries = []
+        for path in self.entries_dir.glob("*.json"):
+            stat = path.stat()
+            if now - stat.st_mtime > max_age_days * 86400:
+                path.unlink()
+                continue
+            try:
+                blobs = _entry_blobs(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError, KeyError):
+                path.unlink()
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size, blobs))
+        entries.sort(reverse=True)
+
+        blob_sizes = {
+            p.name: p.stat().st_size
+            for p in self.blob_dir.iterdir()
+            if not p.name.startswith(".")
+        }
+        kept_blobs = set()
+        total = 0
+        for _, path, size, blobs in entries:
+            new_blobs = blobs - kept_blobs
+            cost = size + sum(blob_sizes.get(b, 0) for b in new_blobs)
+            if total + cost > max_bytes:
+                path.unlink()
+                continue
+            total += cost
+            kept_blobs |= new_blobs
+        for name in blob_sizes.keys() - kept_blobs:
+            (self.blob_dir / name).unlink()
+
+
+## Kernel side: these run inside the notebook's kernel, which imports this
+## module through the setup code in ``_kernel_setup_code``
+SYSTEM_DIRS = ("/usr", "/etc", "/proc", "/sys", "/dev")
+_tracked_inputs = set()
+_tracking = False
+_initial_environ = {}
+## name -> (id of the value, spec or None if it couldn't be saved) as of the
+## last snapshot, so unchanged variables aren't hashed and written again
+_saved = {}
+
+
+def _audit_hook(event, args):
+    if event != "open" or not _tracking:
+        return
+    path, mode, flags = args
+    if not isinstance(path, (str, bytes)):
+        return
+    if mode is not None:
+        if any(c in mode for c in "wax+"):
+            return
+    elif flags & (os.O_WRONLY | os.O_RDWR):
+        return
+    _tracked_inputs.add(os.fsdecode(path))
+
+
+def kernel_install():
+    _initial_environ.update(os.environ)
+    sys.addaudithook(_audit_hook)
+
+
+def kernel_begin_cell():
+    global _tracking
+    _tracked_inputs.clear()
+    _tracking = True
+
+
+def _is_project_input(path):
+    """Keep files the notebook's code read; drop the interpreter's and
+    libraries' own files, caches and dot-directories."""
+    path = os.path.abspath(path)
+    if not os.path.isfile(path) or path.endswith(".pyc"):
+        return False
+    for prefix in {sys.prefix, sys.base_prefix, sys.exec_prefix, *SYSTEM_DIRS}:
+        if path.startswith(os.path.join(prefix, "")):
+            return False
+    parts = Path(path).parts
+    return not any(
+        part.startswith(".") or part in ("site-packages", "__pycache__")
+        for part in parts
+    )
+
+
+def _is_replayed_definition(name, value):
+    """Functions and classes bound by a ``def``/``class`` in the notebook are
+    replayed from source rather than pickled."""
+    return (
+        isinstance(value, (types.FunctionType, type))
+        and getattr(value, "__module__", None) == "__main__"
+        and value.__name__ == name
+    )
+
+
+def _user_variables(shell):
+    hidden = shell.user_ns_hidden
+    return {
+        name: value
+        for name, value in shell.user_ns.items()
+        if not name.startswith("_")
+        and name not in hidden
+        and not isinstance(value, types.ModuleType)
+        and not _is_replayed_definition(name, value)
+    }
+
+
+def _capture_global_state():
+    """Process-wide state that cells commonly change and that isn't held in a
+    user variable."""
+    state = {
+        "random": random.getstate(),
+        "cwd": os.getcwd(),
+        "environ": {
+            "set": {
+                k: v for k, v in os.environ.items() if _initial_environ.get(k) != v
+            },
+            "unset": [k for k in _initial_environ if k not in os.environ],
+        },
+    }
+    np = sys.modules.get("numpy")
+    if np is not None:
+        state["numpy.random"] = np.random.get_state()
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        from pandas._config import config as pd_config
+
+        state["pandas.options"] = {
+            key: pd.get_option(key)
+            for key in pd_config._registered_options
+            if key not in pd_config._deprecated_options
+        }
+    mpl = sys.modules.get("matplotlib")
+    if mpl is not None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            state["matplotlib.rcParams"] = {
+                k: v
+                for k, v in mpl.rcParams.items()
+                if k not in ("backend", "backend_fallback")
+            }
+    return state
+
+
+def _restore_global_state(state):
+    random.setstate(state["random"])
+    os.chdir(state["cwd"])
+    os.environ.update(state["environ"]["set"])
+    for key in state["environ"]["unset"]:
+        os.environ.pop(key, None)
+    if "numpy.random" in state:
+        import numpy
+
+        numpy.random.set_state(state["numpy.random"])
+    if "pandas.options" in state:
+        import pandas
+
+        for key, value in state["pandas.options"].items():
+            if pandas.get_option(key) != value:
+                pandas.set_option(key, value)
+    if "matplotlib.rcParams" in state:
+        import matplotlib
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            matplotlib.rcParams.update(state["matplotlib.rcParams"])
+
+
+def _save_variable(value, blob_dir):
+    """Write a variable to the blob store; return its spec."""
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        try:
+            h = hashlib.blake2b(digest_size=20)
+            h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+            h.update(repr((list(value.columns), list(map(str, value.dtypes)))).encode())
+            h.update(repr((value.index.names, str(value.index.dtype))).encode())
+            blob = f"{h.hexdigest()}.parquet"
+            if not (blob_dir / blob).exists():
+                tmp = blob_dir / f".{blob}.tmp"
+                value.to_parquet(tmp)
+                os.replace(tmp, blob_dir / blob)
+            return {"blob": blob, "format": "parquet"}
+        except Exception:
+            pass  # unhashable or non-Parquet columns; fall back to pickle
+    try:
+        import cloudpickle as pickler  # pickles lambdas and partials by value
+    except ImportError:
+        pickler = pickle
+    data = pickler.dumps(value, protocol=5)
+    blob = f"{hashlib.blake2b(data, digest_size=20).hexdigest()}.pkl"
+    if not (blob_dir / blob).exists():
+        tmp = blob_dir / f".{blob}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, blob_dir / blob)
+    return {"blob": blob, "format": "pickle"}
+
+
+def _load_variable(spec, blob_dir):
+    path = Path(blob_dir) / spec["blob"]
+    if spec["format"] == "parquet":
+        import pandas as pd
+
+        return pd.read_parquet(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _rebind_globals(value, namespace):
+    """cloudpickle gives functions from the notebook a private copy of the
+    globals they used; point them back at the live namespace."""
+    if not (
+        isinstance(value, types.FunctionType)
+        and getattr(value, "__module__", None) == "__main__"
+    ):
+        return value
+    rebound = types.FunctionType(
+        value.__code__,
+        namespace,
+        value.__name__,
+        value.__defaults__,
+        value.__closure__,
+    )
+    rebound.__kwdefaults__ = value.__kwdefaults__
+    rebound.__dict__.update(value.__dict__)
+    rebound.__qualname__ = value.__qualname__
+    rebound.__module__ = value.__module__
+    return rebound
+
+
+def _report(result):
+    print(RESULT_MARKER + json.dumps(result))
+
+
+def _names_in(source, shell):
+    """Names a cell's source mentions, or None if it can't be parsed."""
+    try:
+        tree = ast.parse(shell.transform_cell(source))
+    except SyntaxError:
+        return None
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+
+
+def kernel_snapshot(shell, blob_dir, source):
+    """Save the user's variables and report them with the cell's inputs.
+
+    A variable still bound to the object saved last time is saved again only
+    if the cell mentions it (or another name for the same object), since
+    that's how a cell usually changes an object in place."""
+    global _tracking
+    _tracking = False
+    blob_dir = Path(blob_dir)
+    user_variables = _user_variables(shell)
+    mentioned = _names_in(source, shell)
+    if mentioned is None:
+        _saved.clear()
+        mentioned = set()
+    mentioned_ids = {id(user_variables[n]) for n in mentioned if n in user_variables}
+    variables = {}
+    unsaved = []
+    for name, value in user_variables.items():
+        previous = _saved.get(name)
+        if previous is None or previous[0] != id(value) or id(value) in mentioned_ids:
+            try:
+                spec = _save_variable(value, blob_dir)
+            except Exception:
+                spec = None
+            previous = _saved[name] = (id(value), spec)
+        if previous[1] is None:
+            unsaved.append(name)
+        else:
+            variables[name] = previous[1]
+    for name in _saved.keys() - user_variables.keys():
+        del _saved[name]
+    state = _save_variable(_capture_global_state(), blob_dir)
+    inputs = sorted(os.path.abspath(p) for p in _tracked_inputs if _is_project_input(p))
+    _report(
+        {"variables": variables, "state": state, "unsaved": unsaved, "inputs": inputs}
+    )
+
+
+def _is_replayed_call(node):
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Call)
+        and ast.unparse(node.value.func).startswith(REPLAY_CALL_PREFIXES)
+    )
+
+
+def _replay_statements(tree):
+    body = [
+        node
+        for node in tree.body
+        if isinstance(node, REPLAY_NODE_TYPES) or _is_replayed_call(node)
+    ]
+    return ast.Module(body=body, type_ignores=[])
+
+
+def _module_path(node, namespace):
+    """Fully qualified name behind ``mod.attr[...].attr`` if its root name is
+    bound to a module, else None."""
+    parts = []
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        if isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    module = namespace.get(node.id)
+    if not isinstance(module, types.ModuleType):
+        return None
+    return ".".join([module.__name__, *reversed(parts)])
+
+
+def _top_level_nodes(tree):
+    """Nodes executed when the cell runs: everything except the bodies of
+    functions, classes and lambdas."""
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop()
+        yield node
+        if not isinstance(node, (*REPLAY_NODE_TYPES, ast.Lambda)):
+            pending.extend(ast.iter_child_nodes(node))
+
+
+def _uncaptured_state_change(tree, namespace):
+    """First top-level statement that changes module state the snapshot
+    doesn't capture, as source text, or None."""
+    for node in _top_level_nodes(tree):
+        if isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Delete)):
+            targets = getattr(node, "targets", None) or [node.target]
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            if _is_replayed_call(node):
+                continue
+            targets = [node.value.func]
+        else:
+            continue
+        for target in targets:
+            if isinstance(target, ast.Name):
+                continue
+            path = _module_path(target, namespace)
+            if path is not None and not path.startswith(CAPTURED_STATE_PREFIXES):
+                return ast.unparse(node)
+    return None
+
+
+def _bound_names(node):
+    """Names bound by a top-level assignment statement."""
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    return {
+        n.id
+        for target in targets
+        for n in ast.walk(target)
+        if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)
+    }
+
+
+def _rebuild_unsaved(trees, names, shell, loaded):
+    """Rebuild variables that couldn't be pickled (connections, locks, open
+    files) by replaying the last assignment to each of them, in notebook
+    order. Returns the names that couldn't be rebuilt."""
+    creators = {}
+    for position, node in enumerate(
+        node
+        for tree in trees
+        for node in tree.body
+        if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None
+    ):
+        for name in _bound_names(node) & set(names):
+            creators[name] = (position, node)
+    missing = set(names) - creators.keys()
+    for _, node in sorted(set(creators.values()), key=lambda item: item[0]):
+        bound = _bound_names(node)
+        try:
+            module = ast.Module(body=[node], type_ignores=[])
+            exec(compile(module, "<cell-cache replay>", "exec"), shell.user_ns)
+        except Exception as e:
+            print(f"WARNING: couldn't rebuild {', '.join(sorted(bound))}: {e}")
+            missing |= bound & set(names)
+        ## the statement may also rebind variables that were restored
+        for name in bound & loaded.keys():
+            shell.user_ns[name] = loaded[name]
+    return missing
+
+
+def kernel_restore(shell, blob_dir, sources, variables, state, unsaved, later):
+    """Rebuild the kernel state after the cached cells: replay their imports
+    and definitions, load the snapshot of their variables, rebuild the ones
+    that couldn't be saved, and restore the process-wide state.
+
+    Fails if a variable can't be rebuilt and one of the ``later`` cells (the
+    ones that will run) mentions it."""
+    try:
+        trees = []
+        for source in sources:
+            tree = ast.parse(shell.transform_cell(source))
+            module = _replay_statements(tree)
+            exec(compile(module, "<cell-cache replay>", "exec"), shell.user_ns)
+            change = _uncaptured_state_change(tree, shell.user_ns)
+            if change is not None:
+                raise RuntimeError(f"can't restore the effect of `{change}`")
+            trees.append(tree)
+        loaded = {}
+        for name, spec in variables.items():
+            value = _rebind_globals(_load_variable(spec, blob_dir), shell.user_ns)
+            shell.user_ns[name] = loaded[name] = value
+            _saved[name] = (id(value), spec)
+        missing = _rebuild_unsaved(trees, unsaved, shell, loaded)
+        for name in set(unsaved) - missing:
+            _saved[name] = (id(shell.user_ns.get(name)), None)
+        needed = set()
+        for source in later:
+            names = _names_in(source, shell)
+            needed |= missing if names is None else names
+        if missing & needed:
+            raise RuntimeError(
+                f"couldn't rebuild {', '.join(sorted(missing & needed))}"
+            )
+        _restore_global_state(_load_variable(state, blob_dir))
+    except Exception as e:
+        _report({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    else:
+        _report({"ok": True})
+
+
+## Host side: drive the kernel through nbclient
+def _kernel_setup_code():
+    module_dir = str(Path(__file__).resolve().parent)
+    return (
+        "import sys as _cell_cache_sys\n"
+        f"_cell_cache_sys.path.insert(0, {module_dir!r})\n"
+        "import cell_cache as _cell_cache\n"
+        "_cell_cache_sys.path.pop(0)\n"
+        "_cell_cache.kernel_install()\n"
+    )
+
+
+def _run_hidden(client, code, cell_index):
+    """Run bookkeeping code in the kernel and return its reported result."""
+    import nbformat
+
+    cell = nbformat.v4.new_code_cell(code)
+    ## nbclient stores the executed cell back into the notebook at cell_index
+    original = client.nb.cells[cell_index]
+    try:
+        client.execute_cell(cell, cell_index, store_history=False)
+    finally:
+        client.nb.cells[cell_index] = original
+    for output in cell.outputs:
+        if output.output_type == "stream" and output.name == "stdout":
+            for line in output.text.splitlines():
+                if line.startswith(RESULT_MARKER):
+                    return json.loads(line[len(RESULT_MARKER) :])
+    return None
+
+
+class RestoreFailed(Exception):
+    pass
+
+
+def _execute(nb, notebook_dir, cache, keys, hits, timeout):
+    """Execute ``nb`` in a fresh kernel, filling cells in ``hits`` from the
+    cache and storing entries for the cells that run."""
+    import nbformat
+    from nbclient import NotebookClient
+
+    client = NotebookClient(
+        nb, timeout=timeout, resources={"metadata": {"path": str(notebook_dir)}}
+    )
+    blob_dir = str(cache.blob_dir)
+    code_cells = [i for i, cell in enumerate(nb.cells) if cell.cell_type == "code"]
+    with client.setup_kernel():
+        _run_hidden(client, _kernel_setup_code(), 0)
+        if hits and len(hits) < len(code_cells):
+            last = max(hits)
+            result = _run_hidden(
+                client,
+                "_cell_cache.kernel_restore(get_ipython(), {!r}, {!r}, {!r}, {!r}, "
+                "{!r}, {!r})".format(
+                    blob_dir,
+                    [nb.cells[i].source for i in sorted(hits)],
+                    hits[last]["variables"],
+                    hits[last]["state"],
+                    hits[last]["unsaved"],
+                    [nb.cells[i].source for i in code_cells if i not in hits],
+                ),
+                last,
+            )
+            if not result or not result["ok"]:
+                raise RestoreFailed(
+                    f"can't restore the cached cells ({result and result['error']})"
+                )
+
+        for count, index in enumerate(code_cells, start=1):
+            cell = nb.cells[index]
+            if index in hits:
+                cell.outputs = nbformat.from_dict(hits[index]["outputs"])
+                cell.execution_count = count if cell.source.strip() else None
+                continue
+            _run_hidden(client, "_cell_cache.kernel_begin_cell()", index)
+            client.execute_cell(cell, index, execution_count=count)
+            if keys[index] is None:
+                continue
+            snapshot = _run_hidden(
+                client,
+                "_cell_cache.kernel_snapshot(get_ipython(), {!r}, {!r})".format(
+                    blob_dir, cell.source
+                ),
+                index,
+            )
+            cache.store(keys[index], cell.outputs, snapshot)
+
+
+def execute_notebook(
+    notebook_path, cache_dir, max_bytes=5 * 2**30, max_age_days=30, timeout=None
+):
+    """Execute a notebook in place, reusing cached cells where possible."""
+    import nbformat
+    from nbconvert.preprocessors import ClearMetadataPreprocessor
+
+    notebook_path = Path(notebook_path)
+    notebook_dir = notebook_path.parent.resolve()
+    nb = nbformat.read(notebook_path, as_version=4)
+    cache = CellCache(cache_dir)
+    keys = cell_keys(nb, notebook_dir)
+
+    ## Longest prefix of code cells with usable cache entries
+    hits = {}
+    for index, key in keys.items():
+        entry = cache.lookup(key)
+        if entry is None:
+            break
+        hits[index] = entry
+    print(f"{notebook_path.name}: {len(hits)} of {len(keys)} code cells cached.")
+
+    if len(hits) == len(keys):
+        for count, index in enumerate(keys, start=1):
+            nb.cells[index].outputs = nbformat.from_dict(hits[index]["outputs"])
+            nb.cells[index].execution_count = (
+                count if nb.cells[index].source.strip() else None
+            )
+    else:
+        try:
+            _execute(nb, notebook_dir, cache, keys, hits, timeout)
+        except RestoreFailed as e:
+            print(f"WARNING: {e}; re-executing {notebook_path.name} from the top.")
+            nb = nbformat.read(notebook_path, as_version=4)
+            _execute(nb, notebook_dir, cache, keys, {}, timeout)
+
+    nb, _ = ClearMetadataPreprocessor(enabled=True).preprocess(nb, {})
+    nbformat.write(nb, notebook_path)
+    cache.evict(max_bytes, max_age_days)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("notebook")
+    parser.add_argument("--cache-dir", required=True)
+    parser.add_argument("--max-gb", type=float, default=5)
+    parser.add_argument("--max-age-days", type=float, default=30)
+    args = parser.parse_args()
+
+    execute_notebook(
+        args.notebook,
+        args.cache_dir,
+        max_bytes=int(args.max_gb * 2**30),
+        max_age_days=args.max_age_days,
+    )
@@ -0,0 +1,122 @@
+"""RAM-backed staging for the docs build and atomic publishing to ``docs/``.
+
+``_docs`` (the assembled Sphinx sources and ``_docs/_build``) is pure
+intermediate output. With ``DOCS_BUILD_IN_RAM=True`` in ``.env``,
+``use_ram_staging`` moves it to a directory on tmpfs (``/dev/shm``) and leaves
+a ``_docs`` symlink in its place, so every path in ``dodo.py`` keeps working
+while intermediate files never touch the disk. Turning the option off moves
+the contents back to a regular directory.
+
+``publish_directory`` replaces ``docs/`` with a freshly built copy of the HTML
+output in one step: the new tree is written next to ``docs/`` and then
+swapped in with a single ``renameat2(RENAME_EXCHANGE)`` on Linux (or two
+renames elsewhere). A failed or interrupted build never leaves ``docs/``
+half-updated, and files that are no longer produced by the build disappear.
+
+Meant to be used as an imported module (see ``dodo.py``).
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import shutil
+import sys
+from pathlib import Path
+
+RAM_DIR = Path("/dev/shm")
+
+
+def ram_staging_dir(base_dir, name):
+    """Per-project directory on tmpfs, so checkouts don't collide."""
+    base_dir = Path(base_dir).resolve()
+    digest = hashlib.sha256(str(base_dir).encode()).hexdigest()[:8]
+    return RAM_DIR / f"{base_dir.name}-{digest}" / name
+
+
+def use_ram_staging(docs_dir, base_dir):
+    """Make ``docs_dir`` a symlink into tmpfs, migrating existing contents.
+
+    Returns True if staging in RAM is active."""
+    docs_dir = Path(docs_dir)
+    if not RAM_DIR.is_dir():
+        print(f"WARNING: {RAM_DIR} not available; building {docs_dir} on disk.")
+        return False
+    target = ram_staging_dir(base_dir, docs_dir.name)
+    target.mkdir(parents=True, exist_ok=True)
+
+    if docs_dir.is_symlink():
+        if docs_dir.resolve() == target.resolve():
+            return True
+        docs_dir.unlink()
+    elif docs_dir.exists():
+        shutil.copytree(docs_dir, target, symlinks=True, dirs_exist_ok=True)
+        shutil.rmtree(docs_dir)
+    docs_dir.symlink_to(target, target_is_directory=True)
+    return True
+
+
+def use_disk_staging(docs_dir):
+    """Undo ``use_ram_staging``: replace the symlink with a real directory
+    holding whatever the tmpfs copy still has."""
+    docs_dir = Path(docs_dir)
+    if not docs_dir.is_symlink():
+        return
+    target = docs_dir.resolve()
+    docs_dir.unlink()
+    if target.is_dir():
+        shutil.copytree(target, docs_dir, symlinks=True)
+        shutil.rmtree(target)
+    else:
+        docs_dir.mkdir(parents=True)
+
+
+def _exchange(a, b):
+    """Atomically swap two paths with renameat2(RENAME_EXCHANGE).
+    Returns False if the platform doesn't support it."""
+    if not sys.platform.startswith("linux"):
+        return False
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    renameat2 = getattr(libc, "renameat2", None)
+    if renameat2 is None:
+        return False
+    AT_FDCWD = -100
+    RENAME_EXCHANGE = 2
+    result = renameat2(
+        AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE
+    )
+    return result == 0
+
+
+def publish_directory(src, dst, touch=()):
+    """Replace ``dst`` with a copy of ``src`` in a single swap.
+
+    Args:
+        src: directory to publish (e.g. ``_docs/_build/html``)
+        dst: published directory (e.g. ``docs``)
+        touch: extra empty files to create in the published tree
+    """
+    src = Path(src)
+    dst = Path(dst)
+    incoming = dst.with_name(f".{dst.name}.incoming")
+    outgoing = dst.with_name(f".{dst.name}.outgoing")
+
+    ## Recover from an interrupted non-atomic swap
+    if not dst.exists() and outgoing.exists():
+        os.rename(outgoing, dst)
+    for leftover in (incoming, outgoing):
+        if leftover.exists():
+            shutil.rmtree(leftover)
+
+    shutil.copytree(src, incoming)
+    for name in touch:
+        (incoming / name).touch()
+
+    if not dst.exists():
+        os.rename(incoming, dst)
+    elif _exchange(incoming, dst):
+        shutil.rmtree(incoming)
+    else:
+        os.rename(dst, outgoing)
+        os.rename(incoming, dst)
+        shutil.rmtree(outgoing)
@@ -0,0 +1,85 @@
+"""A faster file-dependency checker for doit.
+
+doit's default ``md5`` checker re-hashes a ``file_dep`` with MD5 whenever its
+mtime changed, and re-hashes again when saving the task's state. This project
+tracks hundreds of pages plus large PDFs and images as ``file_dep``, so that
+adds up. ``StatFastHashChecker`` trusts ``os.stat`` first (an unchanged
+``(mtime_ns, size)`` pair means an unchanged file; a different size means a
+changed file) and only hashes when the mtime moved but the size did not. When
+it does hash, it uses xxHash (XXH3-128) if the ``xxhash`` package is installed
+and falls back to the standard library's BLAKE2b otherwise, both of which are
+considerably faster than MD5.
+
+Used via ``DOIT_CONFIG["check_file_uptodate"]`` in ``dodo.py``.
+"""
+
+import hashlib
+import os
+
+from doit.dependency import FileChangedChecker
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - depends on the environment
+    xxhash = None
+
+CHUNK_SIZE = 1024 * 1024
+
+
+if xxhash is not None:
+    HASH_NAME = "xxh3_128"
+
+    def _new_hash():
+        return xxhash.xxh3_128()
+
+else:
+    HASH_NAME = "blake2b"
+
+    def _new_hash():
+        return hashlib.blake2b(digest_size=16)
+
+
+def fast_file_digest(path):
+    """Return ``"<algorithm>:<hexdigest>"`` for a file's contents. The algorithm
+    is part of the digest so states saved with a different hash never compare
+    equal by accident."""
+    h = _new_hash()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return f"{HASH_NAME}:{h.hexdigest()}"
+
+
+class StatFastHashChecker(FileChangedChecker):
+    """Checker that uses ``(mtime_ns, size, fast hash)`` as the file state."""
+
+    def check_modified(self, file_path, file_stat, state):
+        """Check if file in file_path is modified from previous "state"."""
+        try:
+            mtime_ns, size, digest = state
+        except (TypeError, ValueError):
+            # State written by another checker (e.g. doit's md5 checker)
+            return True
+
+        # 1 - same mtime and size: trust the stat, skip reading the file
+        if file_stat.st_mtime_ns == mtime_ns and file_stat.st_size == size:
+            return False
+
+        # 2 - different size: certainly modified
+        if file_stat.st_size != size:
+            return True
+
+        # 3 - mtime moved but size is the same (e.g. a re-copy): hash it
+        return digest != fast_file_digest(file_path)
+
+    def get_state(self, dep, current_state):
+        file_stat = os.stat(dep)
+        # If the file still matches the saved stat there is nothing to update
+        if (
+            current_state
+            and len(current_state) == 3
+            and current_state[0] == file_stat.st_mtime_ns
+            and current_state[1] == file_stat.st_size
+        ):
+            return None
+        return file_stat.st_mtime_ns, file_stat.st_size, fast_file_digest(dep)
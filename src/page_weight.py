@@ -0,0 +1,264 @@
+"""Page-weight report for the built HTML book.
+
+Notebook pages with inlined Plotly output and base64 images can weigh many MB
+each. ``build_page_weight_report`` walks ``_docs/_build/html``, analyzes every
+page in parallel with BeautifulSoup, and writes a JSON report and a sortable
+HTML report. Each page's metrics are compared against per-page budgets; pages
+over budget are listed and the report step fails.
+
+Budgets map glob patterns (matched against the page's path relative to the
+HTML root) to limits. All matching patterns are applied in order, so later,
+more specific patterns override earlier ones::
+
+    {
+        "*": {"total_bytes": 10_000_000, "external_requests": 20},
+        "notebooks/*": {"total_bytes": 25_000_000},
+    }
+
+Meant to be used as an imported module (see ``dodo.py``).
+"""
+
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from bs4 import BeautifulSoup
+
+METRICS = [
+    "total_bytes",
+    "html_bytes",
+    "inline_script_bytes",
+    "inline_style_bytes",
+    "image_bytes",
+    "external_requests",
+]
+N_OFFENDERS = 5
+
+## (tag, attribute) pairs that make the browser fetch something
+RESOURCE_ATTRIBUTES = [
+    ("script", "src"),
+    ("img", "src"),
+    ("iframe", "src"),
+    ("source", "src"),
+    ("video", "src"),
+    ("audio", "src"),
+    ("link", "href"),
+]
+LINK_RELS_FETCHED = {"stylesheet", "preload", "modulepreload", "icon", "prefetch"}
+
+
+def _is_external(url):
+    return url.startswith(("http://", "https://", "//"))
+
+
+def _local_resource(page_path, url, html_root):
+    """Resolve a relative URL on ``page_path`` to a file under ``html_root``."""
+    path = unquote(urlsplit(url).path)
+    if not path:
+        return None
+    if path.startswith("/"):
+        candidate = Path(html_root) / path.lstrip("/")
+    else:
+        candidate = Path(page_path).parent / path
+    return candidate if candidate.is_file() else None
+
+
+def _describe(tag):
+    """Short human-readable label for an element in the offenders list."""
+    label = tag.name
+    if tag.get("id"):
+        label += f"#{tag['id']}"
+    classes = tag.get("class")
+    if classes:
+        label += "." + ".".join(classes[:2])
+    return label
+
+
+def analyze_page(page_path, html_root):
+    """Compute weight metrics for a single HTML page."""
+    page_path = Path(page_path)
+    raw = page_path.read_bytes()
+    soup = BeautifulSoup(raw, "html.parser")
+
+    metrics = dict.fromkeys(METRICS, 0)
+    metrics["html_bytes"] = len(raw)
+    offenders = []
+    local_bytes = 0
+    seen_local = set()
+
+    for script in soup.find_all("script"):
+        if script.get("src"):
+            continue
+        size = len((script.string or "").encode("utf-8"))
+        metrics["inline_script_bytes"] += size
+        offenders.append(("inline <script>", _describe(script.parent), size))
+
+    for style in soup.find_all("style"):
+        size = len((style.string or "").encode("utf-8"))
+        metrics["inline_style_bytes"] += size
+        offenders.append(("inline <style>", _describe(style.parent), size))
+
+    for tag_name, attr in RESOURCE_ATTRIBUTES:
+        for tag in soup.find_all(tag_name):
+            url = tag.get(attr)
+            if not url:
+                continue
+            if tag_name == "link" and not LINK_RELS_FETCHED & set(tag.get("rel", [])):
+                continue
+            if url.startswith("data:"):
+                size = len(url.encode("utf-8"))
+                if tag_name == "img":
+                    metrics["image_bytes"] += size
+                offenders.append((f"data: URI <{tag_name}>", _describe(tag), size))
+            elif _is_external(url):
+                metrics["external_requests"] += 1
+            else:
+                resource = _local_resource(page_path, url, html_root)
+                if resource is None or resource in seen_local:
+                    continue
+                seen_local.add(resource)
+                size = resource.stat().st_size
+                local_bytes += size
+                if tag_name == "img":
+                    metrics["image_bytes"] += size
+                offenders.append((f"<{tag_name}> {url}", _describe(tag), size))
+
+    metrics["total_bytes"] = metrics["html_bytes"] + local_bytes
+    offenders.sort(key=lambda o: o[2], reverse=True)
+    return {
+        "page": page_path.relative_to(html_root).as_posix(),
+        **metrics,
+        "largest": [
+            {"element": kind, "where": where, "bytes": size}
+            for kind, where, size in offenders[:N_OFFENDERS]
+        ],
+    }
+
+
+def budget_for(page, budgets):
+    """Merge the limits of every budget pattern that matches ``page``."""
+    limits = {}
+    for pattern, page_limits in budgets.items():
+        if fnmatch(page, pattern):
+            limits.update(page_limits)
+    return limits
+
+
+def check_budgets(results, budgets):
+    """Return a list of ``(page, metric, value, limit)`` budget violations."""
+    violations = []
+    for result in results:
+        for metric, limit in budget_for(result["page"], budgets).items():
+            if result[metric] > limit:
+                violations.append((result["page"], metric, result[metric], limit))
+    return violations
+
+
+def _analyze_page_star(args):
+    return analyze_page(*args)
+
+
+def _write_html_report(results, violations, path):
+    over = {(page, metric) for page, metric, _, _ in violations}
+    header = "".join(f"<th>{m}</th>" for m in ["page", *METRICS, "largest elements"])
+    rows = []
+    for r in results:
+        cells = [f"<td>{html.escape(r['page'])}</td>"]
+        for m in METRICS:
+            cls = ' class="over"' if (r["page"], m) in over else ""
+            cells.append(f'<td data-v="{r[m]}"{cls}>{r[m]:,}</td>')
+        largest = "<br>".join(
+            f"{html.escape(o['element'][:80])} in {html.escape(o['where'])}: "
+            f"{o['bytes']:,}"
+            for o in r["largest"]
+        )
+        cells.append(f"<td>{largest}</td>")
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+    document = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Page weight report</title>
+<style>
+body {{ font-family: sans-serif; font-size: 13px; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 3px 6px; vertical-align: top; }}
+th {{ cursor: pointer; background: #eee; }}
+td[data-v] {{ text-align: right; }}
+td.over {{ background: #f8c4c4; }}
+</style></head><body>
+<h1>Page weight report</h1>
+<p>{len(results)} pages, {len(violations)} budget violation(s).
+Click a column header to sort.</p>
+<table id="report"><thead><tr>{header}</tr></thead>
+<tbody>{"".join(rows)}</tbody></table>
+<script>
+document.querySelectorAll("#report th").forEach((th, i) => {{
+  th.addEventListener("click", () => {{
+    const body = document.querySelector("#report tbody");
+    const desc = th.dataset.dir !== "desc";
+    th.dataset.dir = desc ? "desc" : "asc";
+    const key = (row) => {{
+      const cell = row.children[i];
+      return cell.dataset.v !== undefined ? Number(cell.dataset.v) : cell.textContent;
+    }};
+    [...body.rows]
+      .sort((a, b) => (key(a) > key(b) ? 1 : key(a) < key(b) ? -1 : 0) * (desc ? -1 : 1))
+      .forEach((row) => body.appendChild(row));
+  }});
+}});
+</script>
+</body></html>
+"""
+    Path(path).write_text(document, encoding="utf-8")
+
+
+def build_page_weight_report(html_root, report_dir, budgets, max_workers=None):
+    """Analyze every page under ``html_root`` and write ``page_weight.json`` and
+    ``page_weight.html`` to ``report_dir``.
+
+    Returns:
+        bool: False if any page exceeded its budget (which fails the doit task)
+    """
+    html_root = Path(html_root)
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    pages = sorted(html_root.rglob("*.html"))
+
+    max_workers = max_workers or min(len(pages), os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(
+            pool.map(
+                _analyze_page_star,
+                [(page, html_root) for page in pages],
+                chunksize=8,
+            )
+        )
+    results.sort(key=lambda r: r["total_bytes"], reverse=True)
+    violations = check_budgets(results, budgets)
+
+    with open(report_dir / "page_weight.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "budgets": budgets,
+                "violations": [
+                    {"page": p, "metric": m, "value": v, "limit": lim}
+                    for p, m, v, lim in violations
+                ],
+                "pages": results,
+            },
+            f,
+            indent=1,
+        )
+    _write_html_report(results, violations, report_dir / "page_weight.html")
+
+    print(f"Page weight report for {len(results)} pages written to {report_dir}")
+    for r in results[:5]:
+        print(f"  {r['total_bytes']:>12,} bytes  {r['page']}")
+    if violations:
+        print(f"{len(violations)} page budget violation(s):")
+        for page, metric, value, limit in violations:
+            print(f"  {page}: {metric} = {value:,} > {limit:,}")
+        return False
+    return True
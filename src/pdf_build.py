@@ -0,0 +1,247 @@
+"""Per-chapter PDF build of the textbook.
+
+A single LaTeX build of the whole book is slow, and any edit anywhere forces
+the whole thing to be redone. Instead, each chapter (the ``overview_w*.md``
+pages and the final-project page, together with everything they pull in via
+``toctree`` and the notebooks they link to) is staged into its own small
+Sphinx project, built with the LaTeX builder, and compiled with ``latexmk``.
+``dodo.py`` turns each chapter into its own doit subtask, so chapters are
+cached independently and can be compiled in parallel (``doit -n 4 pdf``). The
+chapter PDFs are then stitched together with ``pdfpages`` into ``book.pdf``.
+
+Meant to be used as an imported module (see ``dodo.py``).
+"""
+
+import json
+import re
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+DOCS_SRC_DIR = Path("docs_src")
+NOTEBOOKS_DIR = Path("_docs/notebooks")
+PDF_BUILD_DIR = Path("_docs/_build/pdf")
+
+## Chapter name -> root document (relative to docs_src)
+CHAPTERS = {
+    **{f"Week{i}": f"overview_w{i}.md" for i in range(1, 10)},
+    "FinalProject": "final_project.md",
+}
+
+TOCTREE_PATTERN = re.compile(r"```\{toctree\}[^\n]*\n(.*?)```", re.DOTALL)
+NOTEBOOK_LINK_PATTERN = re.compile(r"\]\(([^)\s#]+\.ipynb)")
+
+
+def _toctree_entries(md_path):
+    """Documents listed in the ``toctree`` directives of a MyST page, as paths
+    relative to docs_src."""
+    text = md_path.read_text(encoding="utf-8")
+    entries = []
+    for block in TOCTREE_PATTERN.findall(text):
+        for line in block.splitlines():
+            line = line.strip()
+            if not line or line.startswith(":"):
+                continue
+            entries.append(md_path.parent.relative_to(DOCS_SRC_DIR) / line)
+    return entries
+
+
+def _notebook_for(rel):
+    """Map a docs_src-relative ``notebooks/...`` reference to its file in
+    ``_docs/notebooks`` (where the case-study tasks put it), else None."""
+    if not rel.parts or rel.parts[0] != "notebooks":
+        return None
+    name = rel.name if rel.suffix == ".ipynb" else f"{rel.name}.ipynb"
+    return NOTEBOOKS_DIR / name
+
+
+def _linked_notebooks(md_path):
+    """Notebooks in ``_docs/notebooks`` that a MyST page links to. They may not
+    exist yet if the case-study tasks haven't run."""
+    text = md_path.read_text(encoding="utf-8")
+    notebooks = []
+    for link in NOTEBOOK_LINK_PATTERN.findall(text):
+        if "://" in link:
+            continue
+        target = (md_path.parent / link).resolve()
+        if not target.is_relative_to(DOCS_SRC_DIR.resolve()):
+            continue
+        nb = _notebook_for(target.relative_to(DOCS_SRC_DIR.resolve()))
+        if nb is not None:
+            notebooks.append(nb)
+    return notebooks
+
+
+def chapter_documents(chapter):
+    """Return ``(md_files, notebook_files)`` that make up a chapter.
+
+    ``md_files`` are relative to docs_src (root document first); the toctree
+    is followed recursively. ``notebook_files`` are paths in _docs/notebooks,
+    from toctree entries and links alike."""
+    root = Path(CHAPTERS[chapter])
+    md_files = []
+    notebooks = []
+    pending = [root]
+    while pending:
+        rel = pending.pop(0)
+        nb = _notebook_for(rel)
+        if nb is not None:
+            if nb not in notebooks:
+                notebooks.append(nb)
+            continue
+        if not rel.suffix and (DOCS_SRC_DIR / rel.with_suffix(".md")).exists():
+            rel = rel.with_suffix(".md")
+        if rel in md_files or not (DOCS_SRC_DIR / rel).exists():
+            continue
+        md_files.append(rel)
+        pending.extend(_toctree_entries(DOCS_SRC_DIR / rel))
+        for nb in _linked_notebooks(DOCS_SRC_DIR / rel):
+            if nb not in notebooks:
+                notebooks.append(nb)
+    return md_files, notebooks
+
+
+def chapter_support_files(chapter):
+    """Non-document files (images, PDFs, ...) that live alongside a chapter's
+    pages and may be referenced from them. Relative to docs_src."""
+    md_files, _ = chapter_documents(chapter)
+    dirs = sorted({rel.parent for rel in md_files if rel.parent != Path(".")})
+    support = []
+    for d in dirs:
+        for p in (DOCS_SRC_DIR / d).rglob("*"):
+            if p.is_file() and p.suffix != ".md" and p.name != ".DS_Store":
+                support.append(p.relative_to(DOCS_SRC_DIR))
+    return support
+
+
+def chapter_file_dep(chapter):
+    """Stable sources a chapter depends on (markdown pages, their support
+    files, and the Sphinx configuration)."""
+    md_files, _ = chapter_documents(chapter)
+    paths = [DOCS_SRC_DIR / "conf.py"]
+    paths += [DOCS_SRC_DIR / rel for rel in md_files]
+    paths += [DOCS_SRC_DIR / rel for rel in chapter_support_files(chapter)]
+    paths += [p for p in (DOCS_SRC_DIR / "_static").rglob("*") if p.is_file()]
+    return [str(p) for p in paths]
+
+
+def chapter_pdf_path(chapter):
+    return PDF_BUILD_DIR / chapter / "latex" / f"{chapter}.pdf"
+
+
+def stage_chapter(chapter):
+    """Assemble a self-contained Sphinx source directory for one chapter."""
+    stage = PDF_BUILD_DIR / chapter / "src"
+    if stage.exists():
+        shutil.rmtree(stage)
+    stage.mkdir(parents=True)
+
+    md_files, notebooks = chapter_documents(chapter)
+    for rel in md_files + chapter_support_files(chapter):
+        target = stage / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(DOCS_SRC_DIR / rel, target)
+    for nb in notebooks:
+        if not nb.exists():
+            continue
+        target = stage / "notebooks" / nb.name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(nb, target)
+    if notebooks and (NOTEBOOKS_DIR / "assets").exists():
+        shutil.copytree(NOTEBOOKS_DIR / "assets", stage / "notebooks" / "assets")
+    shutil.copytree(DOCS_SRC_DIR / "_static", stage / "_static")
+
+    ## Reuse the book's Sphinx configuration, but make this chapter the root
+    ## document and give the LaTeX output a per-chapter name.
+    conf = (DOCS_SRC_DIR / "conf.py").read_text(encoding="utf-8")
+    root_doc = md_files[0].with_suffix("").as_posix()
+    conf += (
+        "\n\n# -- Per-chapter PDF build overrides (see src/pdf_build.py) --------\n"
+        f"root_doc = {root_doc!r}\n"
+        "latex_engine = 'xelatex'\n"
+        f"latex_documents = [(root_doc, {chapter + '.tex'!r}, {chapter!r}, "
+        "author, 'manual')]\n"
+    )
+    (stage / "conf.py").write_text(conf, encoding="utf-8")
+    return stage
+
+
+def compile_chapter(chapter):
+    """Stage, build, and compile a single chapter to PDF, recording how long it
+    took in ``compile_time.json`` next to the chapter's build directory."""
+    start = time.perf_counter()
+    stage = stage_chapter(chapter)
+    latex_dir = PDF_BUILD_DIR / chapter / "latex"
+    subprocess.run(
+        ["sphinx-build", "-b", "latex", "-q", str(stage), str(latex_dir)],
+        check=True,
+    )
+    ## The chapter .tex is written for xelatex (fontspec, polyglossia), so
+    ## don't depend on the latexmkrc Sphinx writes to pick the engine
+    subprocess.run(
+        [
+            "latexmk",
+            "-pdfxe",
+            "-interaction=nonstopmode",
+            "-halt-on-error",
+            f"{chapter}.tex",
+        ],
+        cwd=latex_dir,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    elapsed = time.perf_counter() - start
+    with open(PDF_BUILD_DIR / chapter / "compile_time.json", "w") as f:
+        json.dump({"chapter": chapter, "seconds": elapsed}, f)
+    print(f"Compiled {chapter} in {elapsed:.1f}s")
+
+
+def report_chapter_times():
+    """Print the most recent compile time of each chapter. Chapters that were
+    up to date in this run report the time of the build that produced them."""
+    print("Per-chapter PDF compile times (most recent build):")
+    total = 0.0
+    for chapter in CHAPTERS:
+        timing_file = PDF_BUILD_DIR / chapter / "compile_time.json"
+        if not timing_file.exists():
+            print(f"  {chapter:<14}       n/a")
+            continue
+        with open(timing_file) as f:
+            seconds = json.load(f)["seconds"]
+        total += seconds
+        print(f"  {chapter:<14} {seconds:8.1f}s")
+    print(f"  {'(sum)':<14} {total:8.1f}s")
+
+
+def assemble_book(output_name="book"):
+    """Stitch the chapter PDFs together into a single PDF with ``pdfpages``."""
+    lines = [
+        r"\documentclass{report}",
+        r"\usepackage{pdfpages}",
+        r"\usepackage[bookmarks=true]{hyperref}",
+        r"\begin{document}",
+    ]
+    for chapter in CHAPTERS:
+        pdf = chapter_pdf_path(chapter).relative_to(PDF_BUILD_DIR).as_posix()
+        lines.append(
+            rf"\includepdf[pages=-,addtotoc={{1,chapter,0,{chapter},"
+            rf"{chapter.lower()}}}]{{{pdf}}}"
+        )
+    lines.append(r"\end{document}")
+    (PDF_BUILD_DIR / f"{output_name}.tex").write_text(
+        "\n".join(lines) + "\n", encoding="utf-8"
+    )
+    subprocess.run(
+        [
+            "latexmk",
+            "-pdf",
+            "-interaction=nonstopmode",
+            "-halt-on-error",
+            f"{output_name}.tex",
+        ],
+        cwd=PDF_BUILD_DIR,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    report_chapter_times()
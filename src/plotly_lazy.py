@@ -0,0 +1,183 @@
+"""Externalize inline Plotly figures from the built HTML and load them lazily.
+
+Plotly outputs in notebook pages embed each figure's full JSON (data, layout,
+config) in an inline ``Plotly.newPlot(...)`` call; long time series make
+these pages multi-MB and slow to parse. ``externalize_plotly_figures`` walks
+the built HTML and, for every such figure above ``MIN_FIGURE_BYTES``:
+
+- encodes long numeric arrays in the figure data with Plotly's typed-array
+  spec (``{"dtype": "f8", "bdata": <base64>, "shape": ...}``),
+- writes the figure to ``_static/plotly-data/<hash>.json.gz``, plus a
+  ``<hash>.js`` twin that hands the same figure to the page when loaded with
+  a ``<script>`` tag,
+- removes the inline script and marks the figure's ``<div>`` with a
+  ``data-plotly-src`` attribute pointing at the ``.json.gz`` file.
+
+``_static/plotly_lazy.js`` (added to every page via ``html_js_files``) fetches
+and draws each figure with an ``IntersectionObserver`` as it scrolls into
+view, decoding the typed arrays itself so it works with the Plotly.js version
+the notebooks load. Browsers block ``fetch()`` for pages opened from
+``file://``, so a local or offline copy of ``docs/`` loads the ``.js`` twin
+instead; it works the same, just without the gzip saving.
+
+Meant to be used as an imported module (see ``dodo.py``).
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from array import array
+from pathlib import Path
+
+MIN_FIGURE_BYTES = 10_000
+MIN_TYPED_ARRAY_LENGTH = 16
+DATA_DIR = Path("_static") / "plotly-data"
+
+SCRIPT_PATTERN = re.compile(
+    r"<script[^>]*>((?:(?!</script>).)*?Plotly\.newPlot\((?:(?!</script>).)*)</script>",
+    re.DOTALL,
+)
+NEWPLOT_PATTERN = re.compile(r'Plotly\.newPlot\(\s*"([^"]+)",\s*')
+SEPARATOR_PATTERN = re.compile(r"\s*,\s*")
+
+INT32_MIN, INT32_MAX = -(2**31), 2**31 - 1
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _typed_array(values, shape=None):
+    """Encode a flat list of numbers as a Plotly typed-array spec, or return
+    None if the values aren't all numbers."""
+    if not all(_is_number(v) for v in values):
+        return None
+    if all(isinstance(v, int) and INT32_MIN <= v <= INT32_MAX for v in values):
+        dtype, buf = "i4", array("i", values)
+        assert buf.itemsize == 4
+    else:
+        dtype, buf = "f8", array("d", values)
+    if sys.byteorder == "big":
+        buf.byteswap()
+    spec = {"dtype": dtype, "bdata": base64.b64encode(buf.tobytes()).decode("ascii")}
+    if shape is not None:
+        spec["shape"] = list(shape)
+    return spec
+
+
+def encode_typed_arrays(value):
+    """Recursively replace long numeric lists (1-D, or 2-D with equal-length
+    rows) in a trace with typed-array specs."""
+    if isinstance(value, dict):
+        return {k: encode_typed_arrays(v) for k, v in value.items()}
+    if not isinstance(value, list):
+        return value
+    if len(value) >= MIN_TYPED_ARRAY_LENGTH and all(_is_number(v) for v in value):
+        return _typed_array(value)
+    if (
+        value
+        and all(isinstance(row, list) for row in value)
+        and len({len(row) for row in value}) == 1
+        and len(value) * len(value[0]) >= MIN_TYPED_ARRAY_LENGTH
+    ):
+        flat = [v for row in value for v in row]
+        spec = _typed_array(flat, shape=(len(value), len(value[0])))
+        if spec is not None:
+            return spec
+    return [encode_typed_arrays(v) for v in value]
+
+
+def _parse_newplot(script):
+    """Pull ``(div_id, data, layout, config)`` out of a ``Plotly.newPlot``
+    call, or return None if the script doesn't look like Plotly's output."""
+    match = NEWPLOT_PATTERN.search(script)
+    if match is None:
+        return None
+    decoder = json.JSONDecoder()
+    pos = match.end()
+    parts = []
+    try:
+        for _ in range(3):
+            obj, pos = decoder.raw_decode(script, pos)
+            parts.append(obj)
+            sep = SEPARATOR_PATTERN.match(script, pos)
+            if sep is None:
+                break
+            pos = sep.end()
+    except json.JSONDecodeError:
+        if len(parts) < 2:
+            return None
+    if len(parts) < 2 or not isinstance(parts[0], list):
+        return None
+    config = parts[2] if len(parts) > 2 else {}
+    return match.group(1), parts[0], parts[1], config
+
+
+def _write_figure(figure, html_root):
+    """Write a figure to the data directory (deduplicated by content), as
+    ``<hash>.json.gz`` and as a ``<hash>.js`` script for ``file://`` pages."""
+    payload = json.dumps(figure, separators=(",", ":"))
+    compressed = gzip.compress(payload.encode("utf-8"), compresslevel=9, mtime=0)
+    key = hashlib.sha256(compressed).hexdigest()[:16]
+    target = Path(html_root) / DATA_DIR / f"{key}.json.gz"
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.with_suffix("").with_suffix(".js").write_text(
+            f'window.plotlyLazyLoaded("{key}",{payload});\n', encoding="utf-8"
+        )
+        target.write_bytes(compressed)
+    return DATA_DIR / target.name
+
+
+def externalize_page(page, html_root):
+    """Externalize the Plotly figures of one page. Returns the number of
+    figures moved out of the page."""
+    page = Path(page)
+    text = page.read_text(encoding="utf-8")
+    count = 0
+
+    def _replace(match):
+        nonlocal count
+        if len(match.group(0)) < MIN_FIGURE_BYTES:
+            return match.group(0)
+        parsed = _parse_newplot(match.group(1))
+        if parsed is None:
+            return match.group(0)
+        div_id, data, layout, config = parsed
+        figure = {
+            "data": [encode_typed_arrays(trace) for trace in data],
+            "layout": layout,
+            "config": config,
+        }
+        local = _write_figure(figure, html_root)
+        rel = Path(os.path.relpath(Path(html_root) / local, page.parent)).as_posix()
+        pending.append((div_id, rel))
+        count += 1
+        return ""
+
+    pending = []
+    new_text = SCRIPT_PATTERN.sub(_replace, text)
+    ## Mark the first div with this id that isn't marked yet, so a repeated id
+    ## never stacks two figures onto one div
+    for div_id, rel in pending:
+        unmarked = re.compile(f'<div id="{re.escape(div_id)}"(?! data-plotly-src)')
+        new_text = unmarked.sub(rf'\g<0> data-plotly-src="{rel}"', new_text, count=1)
+    if count:
+        page.write_text(new_text, encoding="utf-8")
+    return count
+
+
+def externalize_plotly_figures(html_root):
+    """Externalize Plotly figures from every page under ``html_root``."""
+    html_root = Path(html_root)
+    total = 0
+    pages = 0
+    for page in sorted(html_root.rglob("*.html")):
+        n = externalize_page(page, html_root)
+        total += n
+        pages += bool(n)
+    print(f"Externalized {total} Plotly figure(s) from {pages} page(s).")
@@ -74,6 +74,10 @@ d["START_DATE"] = _config("START_DATE", default="1965-01-29", cast=to_datetime)
 d["END_DATE"] = _config("END_DATE", default="2022-12-31", cast=to_datetime)
 d["PIPELINE_DEV_MODE"] = _config("PIPELINE_DEV_MODE", default=True, cast=bool)
 d["PIPELINE_THEME"] = _config("PIPELINE_THEME", default="pipeline")
+d["BUILD_TRACE"] = _config("BUILD_TRACE", default=False, cast=bool)
+d["DOCS_BUILD_IN_RAM"] = _config("DOCS_BUILD_IN_RAM", default=False, cast=bool)
+d["CELL_CACHE_MAX_GB"] = _config("CELL_CACHE_MAX_GB", default=5, cast=float)
+d["CELL_CACHE_MAX_AGE_DAYS"] = _config("CELL_CACHE_MAX_AGE_DAYS", default=30, cast=float)
 
 ## Paths
 d["DATA_DIR"] = if_relative_make_abs(_config('DATA_DIR', default=Path('_data'), cast=Path))
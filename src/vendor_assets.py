@@ -0,0 +1,174 @@
+"""Vendor third-party CDN scripts into the built book.
+
+The built pages load require.js (injected through ``html_js_files`` in
+``conf.py``), MathJax (Sphinx's ``mathjax_path``), and Plotly (referenced by
+notebook outputs, either as a ``<script src=...>`` or as a require.js
+``paths`` entry without the ``.js`` suffix) from public CDNs.
+``vendor_cdn_scripts`` finds every such URL in the built HTML, downloads each
+script once (cached across builds), writes it to ``_static/vendor/`` under a
+content-hashed filename, and rewrites the pages to point at that copy. Every
+page then shares one long-cacheable file and the book works offline.
+
+MathJax 3 loads its components and TeX extensions (``boldsymbol``, ``color``,
+``mhchem``, ...) on demand, from the directory of its own script, so it can't
+be vendored as a single file. A pinned ``mathjax@X.Y.Z/es5/`` URL is vendored
+by unpacking the whole ``es5/`` tree of that npm release into
+``_static/vendor/mathjax-X.Y.Z/``. The version in the path plays the role of
+the content hash. Floating versions (``mathjax@3``) are not vendored.
+
+If a script can't be downloaded and isn't cached, a warning is printed and
+the pages keep the CDN URL.
+
+Meant to be used as an imported module (see ``dodo.py``).
+"""
+
+import hashlib
+import io
+import os
+import re
+import shutil
+import tarfile
+import urllib.request
+from pathlib import Path
+
+## CDN URLs to vendor. The character class deliberately stops at quotes, so
+## the same pattern matches both "<...>.js" and require.js-style paths that
+## omit the ".js" suffix.
+_URL_CHARS = r"[0-9A-Za-z.\-_/@]+"
+VENDOR_PATTERNS = [
+    re.compile(r"https://cdnjs\.cloudflare\.com/ajax/libs/require\.js/" + _URL_CHARS),
+    re.compile(r"https://cdn\.plot\.ly/plotly-" + _URL_CHARS),
+]
+MATHJAX_PATTERN = re.compile(
+    r"https://cdn\.jsdelivr\.net/npm/mathjax@(\d+\.\d+\.\d+)/es5/"
+)
+MATHJAX_TARBALL = "https://registry.npmjs.org/mathjax/-/mathjax-{version}.tgz"
+VENDOR_DIR = Path("_static") / "vendor"
+
+
+def _download(url, cache_dir):
+    """Return the bytes of ``url``, fetching it at most once per cache."""
+    cache_dir = Path(cache_dir)
+    cached = cache_dir / (
+        hashlib.sha256(url.encode()).hexdigest()[:16] + "_" + url.rsplit("/", 1)[-1]
+    )
+    if cached.exists():
+        return cached.read_bytes()
+    request = urllib.request.Request(url, headers={"User-Agent": "finm-textbook"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        data = response.read()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f".{cached.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, cached)
+    return data
+
+
+def _mathjax_versions(page):
+    return MATHJAX_PATTERN.findall(page.read_text(encoding="utf-8"))
+
+
+def _fingerprinted_name(script_url, data):
+    """``plotly-2.27.0.min.js`` -> ``plotly-2.27.0.min.<hash>.js``"""
+    stem = script_url.rsplit("/", 1)[-1].removesuffix(".js")
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}.js"
+
+
+def _vendor_mathjax(version, html_root, cache_dir):
+    """Unpack the ``es5/`` tree of a MathJax release into the vendor
+    directory. Returns its path relative to ``html_root``."""
+    target = VENDOR_DIR / f"mathjax-{version}"
+    if (html_root / target).is_dir():
+        return target
+    data = _download(MATHJAX_TARBALL.format(version=version), cache_dir)
+
+    staging = html_root / target.with_name(f".{target.name}.tmp")
+    if staging.exists():
+        shutil.rmtree(staging)
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        members = []
+        for member in tar.getmembers():
+            if not member.name.startswith("package/es5/"):
+                continue
+            member.name = member.name.removeprefix("package/es5/")
+            members.append(member)
+        tar.extractall(staging, members=members, filter="data")
+    os.replace(staging, html_root / target)
+    return target
+
+
+def vendor_cdn_scripts(html_root, cache_dir):
+    """Vendor every CDN script referenced from the pages under ``html_root``.
+
+    Returns:
+        dict: CDN script URL -> vendored path relative to ``html_root``
+    """
+    html_root = Path(html_root)
+    pages = sorted(html_root.rglob("*.html"))
+
+    ## Find every referenced URL (with or without the .js suffix)
+    referenced = set()
+    for page in pages:
+        text = page.read_text(encoding="utf-8")
+        for pattern in VENDOR_PATTERNS:
+            referenced.update(pattern.findall(text))
+
+    ## Download and write each distinct script once
+    vendored = {}
+    for script_url in sorted({url.removesuffix(".js") + ".js" for url in referenced}):
+        try:
+            data = _download(script_url, cache_dir)
+        except OSError as e:
+            print(f"WARNING: could not vendor {script_url}: {e}")
+            print("Pages will keep loading it from the CDN.")
+            continue
+        target = VENDOR_DIR / _fingerprinted_name(script_url, data)
+        (html_root / target).parent.mkdir(parents=True, exist_ok=True)
+        if not (html_root / target).exists():
+            (html_root / target).write_bytes(data)
+        vendored[script_url] = target.as_posix()
+
+    ## MathJax: vendor the es5/ tree of each pinned release
+    mathjax_dirs = {}
+    for version in sorted({v for page in pages for v in _mathjax_versions(page)}):
+        try:
+            mathjax_dirs[version] = _vendor_mathjax(version, html_root, cache_dir)
+        except (OSError, tarfile.TarError) as e:
+            print(f"WARNING: could not vendor MathJax {version}: {e}")
+            print("Pages will keep loading it from the CDN.")
+
+    ## Rewrite references, relative to each page
+    rewritten = 0
+    for page in pages:
+        text = page.read_text(encoding="utf-8")
+
+        def _replace(match):
+            url = match.group(0)
+            has_suffix = url.endswith(".js")
+            local = vendored.get(url if has_suffix else url + ".js")
+            if local is None:
+                return url
+            rel = Path(os.path.relpath(html_root / local, page.parent)).as_posix()
+            return rel if has_suffix else rel.removesuffix(".js")
+
+        def _replace_mathjax(match):
+            local = mathjax_dirs.get(match.group(1))
+            if local is None:
+                return match.group(0)
+            return (
+                Path(os.path.relpath(html_root / local, page.parent)).as_posix() + "/"
+            )
+
+        new_text = text
+        for pattern in VENDOR_PATTERNS:
+            new_text = pattern.sub(_replace, new_text)
+        new_text = MATHJAX_PATTERN.sub(_replace_mathjax, new_text)
+        if new_text != text:
+            page.write_text(new_text, encoding="utf-8")
+            rewritten += 1
+
+    print(
+        f"Vendored {len(vendored)} CDN script(s) and {len(mathjax_dirs)} MathJax "
+        f"release(s); rewrote {rewritten} page(s)."
+    )
+    return vendored